@@ -2,18 +2,57 @@
 ReefScan · Marine Intelligence Dashboard
 ========================================
 A professional Streamlit dashboard for coral reef health analysis.
-Backend detection logic is unchanged from original notebook.
+Detection rules are unchanged from the original notebook and live in
+reefscan.engine, which the batch CLI (python -m reefscan) shares; chart
+rendering and report text live in reefscan.charts / reefscan.report.
 """
 
 import streamlit as st
 import numpy as np
-import cv2
-from PIL import Image
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import io
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
 import streamlit.components.v1 as components
 
+from reefscan.engine import (
+    DEFAULT_THRESHOLDS,
+    METRICS,
+    RESIZE_TO,
+    THUMB_SIZE,
+    ColourHist,
+    Decoded,
+    Thresholds,
+    analyze_thumbnail,
+    colour_hist,
+    content_hash,
+    decode_reduced,
+    label_map,
+    resize_for_analysis,
+    score_hist,
+    thresholds_from_fractions,
+)
+from reefscan import timing, vega
+from reefscan.charts import (
+    CHART_DPI,
+    COMPARE_DPI,
+    chart_bar,
+    chart_compare,
+    chart_distribution,
+    chart_donut,
+    chart_gauge,
+    chart_recovery,
+)
+from reefscan.ingest import IngestPool
+from reefscan.overlay import PALETTE, fit_within, render_overlay
+from reefscan.recovery import SCENARIOS
+from reefscan.report import build_report, get_status, results_array, survey_summary
+from reefscan.store import ResultStore
+from reefscan.timing import stage
+
 # ──────────────────────────────────────────────────────────────────────────────
 # PAGE CONFIG
 # ──────────────────────────────────────────────────────────────────────────────
@@ -475,340 +514,372 @@ components.html("""
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# ── BACKEND LOGIC (UNCHANGED FROM ORIGINAL NOTEBOOK) ─────────────────────────
+# ── RESULT CACHE ──────────────────────────────────────────────────────────────
 # ──────────────────────────────────────────────────────────────────────────────
-def analyze_image(pil_image):
-    image = np.array(pil_image.convert("RGB"))
-    image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    image = cv2.resize(image, (500, 500))
-    img   = image / 255.0
-
-    total_pixels = img.shape[0] * img.shape[1]
-
-    # Bleaching = very bright (white) pixels
-    bleach_mask = np.logical_and.reduce((
-        img[:, :, 0] > 0.8,
-        img[:, :, 1] > 0.8,
-        img[:, :, 2] > 0.8,
-    ))
-
-    # Algae bloom = dominant green
-    algae_mask = np.logical_and(
-        img[:, :, 1] > 0.45,
-        img[:, :, 1] > img[:, :, 0],
-    )
+RESULT_CACHE_BYTES = 512 * 1024 * 1024
+SCORE_BYTES = 1024   # nominal cache charge for one R dict
+INGEST_WORKERS = int(os.environ.get("REEFSCAN_INGEST_WORKERS", 0)) or min(8, os.cpu_count() or 1)
+
+
+class LRUCache:
+    """Thread-safe LRU bounded by the total byte size of its values, with hit/miss counters."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()   # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size: int):
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, old_size) = self._items.popitem(last=False)
+                self.nbytes -= old_size
+
+    def __contains__(self, key) -> bool:
+        """Membership without touching recency or the hit/miss counters."""
+        with self._lock:
+            return key in self._items
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.nbytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource
+def result_cache() -> LRUCache:
+    """Uploads under (hash, RESIZE_TO) and their scores under (hash, Thresholds);
+    one cache per server process, shared by every session."""
+    return LRUCache(RESULT_CACHE_BYTES)
+
+
+class Upload(NamedTuple):
+    """Everything kept per uploaded file; none of it depends on the thresholds."""
+    dec:     Decoded
+    hist:    ColourHist   # exact (8-bit) colour histogram of `small`
+    small:   np.ndarray   # RESIZE_TO analysis image, for label maps
+    preview: np.ndarray   # display-size image the overlay is drawn on
+
+    @property
+    def nbytes(self) -> int:
+        return self.dec.rgb.nbytes + self.hist.nbytes + self.small.nbytes + self.preview.nbytes
+
+
+@st.cache_resource
+def result_store():
+    """SQLite results store ($REEFSCAN_DB, else the reefscan cache dir); None if unwritable."""
+    try:
+        return ResultStore()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+@st.cache_resource
+def ingest_pool() -> IngestPool:
+    return IngestPool(INGEST_WORKERS)
+
+
+def upload_hash(uf) -> str:
+    """Content hash of an upload, computed once per uploaded file per session."""
+    memo = st.session_state.setdefault("upload_hashes", {})
+    h = memo.get(uf.file_id)
+    if h is None:
+        with stage("hash"):
+            h = memo[uf.file_id] = content_hash(uf.getvalue())
+    return h
+
+
+def upload_score(h: str, up: Upload, th: Thresholds, cache: LRUCache) -> dict:
+    """R of a decoded upload for `th`, scored from its histogram once per threshold set.
+
+    Re-scoring walks every distinct colour of the analysis image (a few ms),
+    so a slider moved back and forth doesn't pay it again.
+    """
+    R = cache.get((h, th))
+    if R is None:
+        R = score_hist(up.hist, th)
+        cache.put((h, th), R, SCORE_BYTES)
+    return R
+
+
+def decode_upload(h: str, data: bytes, name: str, th: Thresholds, site: str,
+                  cache: LRUCache, store) -> Upload:
+    """Decode and analyse one upload, cache the Upload and queue its result for the store.
+
+    Touches no Streamlit state, so it can run on an ingest worker thread.
+    """
+    dec = decode_reduced(io.BytesIO(data))
+    small = resize_for_analysis(dec.rgb)
+    up = Upload(dec, colour_hist(small, 8), small, fit_within(dec.rgb))
+    for arr in (dec.rgb, small, up.preview):
+        arr.setflags(write=False)
+    cache.put((h, RESIZE_TO), up, up.nbytes)
+    if store is not None:
+        store.add(h, upload_score(h, up, th, cache), th, file=name, site=site, captured=dec.captured,
+                  width=dec.full_size[0], height=dec.full_size[1], bytes=len(data))
+    return up
+
+
+def ingest_uploads(files, th: Thresholds = DEFAULT_THRESHOLDS, site: str = None):
+    """Start decoding every upload that is neither cached nor stored, all at once.
+
+    Returns immediately; analyze_upload picks up the in-flight jobs, so each
+    report renders as soon as its own image is done and a multi-image upload
+    takes about as long as its slowest image. Each file is checked once per
+    session and threshold set: an upload so far served from the store alone
+    has no histogram to re-score, so new thresholds decode it here, in
+    parallel with the rest, rather than one by one on the script thread.
+    """
+    seen = st.session_state.setdefault("ingested", {})   # file_id -> thresholds last checked
+    new = [uf for uf in files if seen.get(uf.file_id) != th]
+    if not new:
+        return
+    with stage("ingest"):
+        cache, store, pool = result_cache(), result_store(), ingest_pool()
+        hashes = [upload_hash(uf) for uf in new]
+        todo = [(uf, h) for uf, h in zip(new, hashes)
+                if (h, RESIZE_TO) not in cache and (h, th) not in cache]
+        stored = store.get_many([h for _, h in todo], th) if store is not None and todo else {}
+        for uf, h in todo:
+            if h in stored:
+                cache.put((h, th), stored[h], SCORE_BYTES)
+            else:
+                pool.submit(h, decode_upload, h, uf.getvalue(), uf.name, th, site, cache, store)
+        seen.update((uf.file_id, th) for uf in new)
+
+
+def analyze_upload(uf, th: Thresholds = DEFAULT_THRESHOLDS, site: str = None):
+    """Return (R, Upload) for an uploaded file, decoding it at most once.
+
+    The cache is keyed by content hash; R is scored from the exact colour
+    histogram, so a different threshold set never needs the pixels again.
+    An image still being ingested is waited for rather than decoded twice.
+    """
+    h = upload_hash(uf)
+    cache = result_cache()
+    job = ingest_pool().pending(h)    # before the cache: a job caches its Upload before it ends
+    if job is not None:
+        with stage("ingest.wait"):
+            up = job.result()
+    else:
+        up = cache.get((h, RESIZE_TO))
+    if up is None:
+        up = decode_upload(h, uf.getvalue(), uf.name, th, site, cache, result_store())
+    return upload_score(h, up, th, cache), up
+
+
+def upload_result(uf, th: Thresholds = DEFAULT_THRESHOLDS, site: str = None) -> dict:
+    """R alone: from the score or upload cache, else the results store, else a full analysis."""
+    h = upload_hash(uf)
+    cache = result_cache()
+    R = cache.get((h, th))
+    if R is not None:
+        return R
+    up = cache.get((h, RESIZE_TO))
+    if up is not None:
+        return upload_score(h, up, th, cache)
+    store = result_store()
+    R = store.get(h, th) if store is not None else None
+    if R is None:
+        return analyze_upload(uf, th, site)[0]
+    cache.put((h, th), R, SCORE_BYTES)
+    return R
+
+
+def survey_results(files, th: Thresholds = DEFAULT_THRESHOLDS, site: str = None):
+    """(names, results_array) for every upload, recomputed only when the upload
+    set or the thresholds change; otherwise reruns reuse the session's copy."""
+    key = (tuple(uf.file_id for uf in files), th)
+    memo = st.session_state.get("survey")
+    if memo is None or memo[0] != key:
+        with stage("survey"):
+            names = [uf.name for uf in files]
+            values = results_array([upload_result(uf, th, site) for uf in files])
+            values.setflags(write=False)
+        flush_results()
+        memo = st.session_state["survey"] = (key, names, values)
+    return memo[1], memo[2]
+
+
+def flush_results():
+    if (store := result_store()) is not None:
+        store.flush()
+
+
+def upload_overlay(up: Upload, th: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """Class overlay for the preview: label map of the analysis image, blended by palette."""
+    return render_overlay(up.preview, label_map(up.small, th))
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# ── CHART RENDER CACHE ────────────────────────────────────────────────────────
+# ──────────────────────────────────────────────────────────────────────────────
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def _chart_key(data) -> tuple:
+    """Rounded, hashable form of a result dict, a survey summary, or a list of (name, result) pairs."""
+    if isinstance(data, dict) and "hist" in data:
+        return (data["n"], tuple(tuple(data["hist"][m]) for m in METRICS))
+    if isinstance(data, dict):
+        return tuple(round(float(data[k]), 2) for k in ("bleach", "algae", "sediment", "health"))
+    return tuple((name, _chart_key(R)) for name, R in data)
+
+
+@st.cache_resource
+def chart_cache() -> LRUCache:
+    """Encoded chart PNGs; one per server process, shared by every session."""
+    return LRUCache(CHART_CACHE_BYTES)
+
+
+CHART_BACKENDS = {"Vega-Lite": "vega", "PNG": "png"}
+
+# chart_fn -> equivalent Vega-Lite spec builder
+VEGA_SPECS = {
+    "chart_bar":      vega.bar_spec,
+    "chart_donut":    vega.donut_spec,
+    "chart_gauge":    vega.gauge_spec,
+    "chart_recovery": vega.recovery_spec,
+    "chart_compare":  vega.compare_spec,
+    "chart_distribution": vega.distribution_spec,
+}
 
-    # Sediment = brownish (red dominant, low blue)
-    sediment_mask = np.logical_and(
-        img[:, :, 0] > 0.4,
-        img[:, :, 2] < 0.3,
-    )
 
-    bleach_percent   = (np.sum(bleach_mask)   / total_pixels) * 100
-    algae_percent    = (np.sum(algae_mask)    / total_pixels) * 100
-    sediment_percent = (np.sum(sediment_mask) / total_pixels) * 100
-    healthy_percent  = max(0, 100 - (bleach_percent + algae_percent + sediment_percent))
+def show_chart(chart_fn, data):
+    """Draw a chart with the renderer picked in the sidebar."""
+    with stage(f"chart.{chart_fn.__name__}"):
+        if CHART_BACKENDS[chart_backend] == "vega":
+            st.vega_lite_chart(VEGA_SPECS[chart_fn.__name__](data), width="stretch", theme=None)
+        else:
+            st.image(cached_chart(chart_fn, data), width="stretch")
 
-    return {
-        "bleach":   round(bleach_percent,   2),
-        "algae":    round(algae_percent,    2),
-        "sediment": round(sediment_percent, 2),
-        "health":   round(healthy_percent,  2),
-    }
+
+def cached_chart(chart_fn, data) -> bytes:
+    """PNG bytes for chart_fn(data), rendered only on the first request."""
+    key = (chart_fn.__name__, _chart_key(data), CHART_DPI, COMPARE_DPI)
+    cache = chart_cache()
+    png = cache.get(key)
+    if png is None:
+        png = chart_fn(data).getvalue()
+        cache.put(key, png, len(png))
+    return png
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# ── CHART FUNCTIONS ───────────────────────────────────────────────────────────
+# ── DIAGNOSTICS ───────────────────────────────────────────────────────────────
 # ──────────────────────────────────────────────────────────────────────────────
-CHART_BG   = "#0D1525"
-C_BLEACH   = "#90CAF9"
-C_ALGAE    = "#69F0AE"
-C_SEDIMENT = "#FFCC80"
-C_HEALTH   = "#00D4FF"
-
-
-def _savefig(fig) -> io.BytesIO:
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=160, bbox_inches="tight",
-                facecolor=CHART_BG, edgecolor="none")
-    buf.seek(0)
-    plt.close(fig)
-    return buf
-
-
-def chart_bar(R: dict) -> io.BytesIO:
-    """Vertical bar chart -- pollution & health breakdown."""
-    labels = ["Coral\nBleaching", "Algae\nBloom", "Sediment", "Marine\nHealth"]
-    values = [R["bleach"], R["algae"], R["sediment"], R["health"]]
-    colors = [C_BLEACH, C_ALGAE, C_SEDIMENT, C_HEALTH]
-
-    fig, ax = plt.subplots(figsize=(9, 5.2))
-    fig.patch.set_facecolor(CHART_BG)
-    ax.set_facecolor(CHART_BG)
-
-    x = np.arange(len(labels))
-    width = 0.52
-
-    # grey 100% background track
-    ax.bar(x, [100] * 4, width=width, color="#FFFFFF", alpha=0.04, zorder=1)
-
-    # coloured value bars
-    bars = ax.bar(x, values, width=width, color=colors, alpha=0.90, zorder=3)
-
-    for bar, val, col in zip(bars, values, colors):
-        # top-edge accent line
-        ax.plot(
-            [bar.get_x() + 0.04, bar.get_x() + bar.get_width() - 0.04],
-            [val, val],
-            color=col, linewidth=3, solid_capstyle="round", zorder=5, alpha=0.85,
-        )
-        # value label above bar
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            val + 1.5,
-            f"{val:.2f}%",
-            ha="center", va="bottom",
-            fontsize=10, fontweight="700",
-            color=col, fontfamily="monospace",
-        )
-
-    ax.set_xticks(x)
-    ax.set_xticklabels(labels, fontsize=10.5, color="#B0CCDE", fontweight="600")
-    ax.set_ylim(0, 118)
-    ax.set_ylabel("Coverage  (%)", color="#2D5A78", fontsize=9, labelpad=10)
-    ax.set_title("Pollution & Health Coverage Analysis",
-                 color="#C5DEF8", fontsize=11.5, fontweight="bold",
-                 pad=16, loc="left")
-    ax.tick_params(axis="x", colors="#2D5A78", labelsize=9, length=0)
-    ax.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
-    ax.grid(axis="y", color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
-
-    # Marine Health Score annotation box
-    score = R["health"]
-    ax.text(
-        0.985, 0.97,
-        f"Marine Health Score\n{score:.2f}%",
-        transform=ax.transAxes, ha="right", va="top",
-        fontsize=9, color="#00D4FF", fontfamily="monospace",
-        bbox=dict(facecolor=(0.024, 0.118, 0.188, 0.85),
-                  edgecolor=(0.0, 0.83, 1.0, 0.4),
-                  boxstyle="round,pad=0.5", linewidth=1),
-    )
+# Stage timings (reefscan.timing) are off unless REEFSCAN_TIMING=1 or a session
+# turns on the sidebar toggle. Prometheus text goes to REEFSCAN_METRICS_FILE
+# after each run and/or is served at :REEFSCAN_METRICS_PORT/metrics.
+METRICS_PORT = os.environ.get("REEFSCAN_METRICS_PORT")
+METRICS_FILE = os.environ.get("REEFSCAN_METRICS_FILE")
+
+
+@st.cache_resource
+def metrics_server():
+    """The process's /metrics endpoint, started once if a port is configured.
+
+    A port that is taken (another dashboard process, say) is reported once on
+    stderr; the dashboard runs without the endpoint.
+    """
+    if not METRICS_PORT:
+        return None
+    try:
+        return timing.serve(int(METRICS_PORT))
+    except OSError as exc:
+        print(f"reefscan: metrics endpoint not started on port {METRICS_PORT}: {exc}",
+              file=sys.stderr)
+        return None
+
+
+CACHE_SERIES = (   # LRUCache.stats() key, Prometheus name, type, help
+    ("entries", "reefscan_cache_entries", "gauge", "Entries held per process cache."),
+    ("bytes", "reefscan_cache_bytes", "gauge", "Bytes held per process cache."),
+    ("hits", "reefscan_cache_hits_total", "counter", "Lookups served per process cache."),
+    ("misses", "reefscan_cache_misses_total", "counter", "Lookups missed per process cache."),
+)
 
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    plt.tight_layout(pad=1.6)
-    return _savefig(fig)
 
+def process_caches() -> dict:
+    return {"results": result_cache(), "charts": chart_cache()}
 
-def chart_donut(R: dict) -> io.BytesIO:
-    """Donut chart — ecosystem composition breakdown."""
-    labels = ["Bleaching", "Algae", "Sediment", "Healthy Water"]
-    values = [R["bleach"], R["algae"], R["sediment"], R["health"]]
-    colors = [C_BLEACH, C_ALGAE, C_SEDIMENT, C_HEALTH]
-    safe   = [max(v, 0.01) for v in values]
 
-    fig, ax = plt.subplots(figsize=(5.4, 5.4))
-    fig.patch.set_facecolor(CHART_BG)
-    ax.set_facecolor(CHART_BG)
+@st.cache_resource
+def cache_metrics():
+    """Add the process caches' counters to the Prometheus export, once per process."""
+    caches = process_caches()
 
-    wedges, _, autotexts = ax.pie(
-        safe, colors=colors, startangle=90,
-        autopct="%1.1f%%", pctdistance=0.76,
-        wedgeprops=dict(width=0.52, edgecolor=CHART_BG, linewidth=2.5),
-    )
-    for at in autotexts:
-        at.set_color("#D6EAF8"); at.set_fontsize(8); at.set_fontweight("600")
-
-    # centre text
-    ax.text(0,  0.13, f"{R['health']:.1f}%",
-            ha="center", va="center", fontsize=21, fontweight="800",
-            color="#00D4FF", fontfamily="monospace")
-    ax.text(0, -0.10, "HEALTH INDEX",
-            ha="center", va="center", fontsize=6.5,
-            color="#2D5A78", fontfamily="monospace", fontstyle="normal")
-
-    patches = [mpatches.Patch(color=c, label=l)
-               for c, l in zip(colors, labels)]
-    ax.legend(handles=patches, loc="lower center",
-              bbox_to_anchor=(0.5, -0.06), ncol=4, frameon=False,
-              fontsize=7.5, labelcolor="#4A7A96")
-    ax.set_title("Ecosystem Composition", color="#C5DEF8",
-                 fontsize=10.5, fontweight="bold", pad=10)
-    plt.tight_layout(pad=1.2)
-    return _savefig(fig)
-
-
-def chart_gauge(R: dict) -> io.BytesIO:
-    """Semi-circular health gauge — Critical / Poor / Fair / Good."""
-    score = R["health"]
-
-    fig, ax = plt.subplots(figsize=(5.8, 3.8))
-    fig.patch.set_facecolor(CHART_BG)
-    ax.set_facecolor(CHART_BG)
-    ax.set_aspect("equal"); ax.axis("off")
-
-    R_OUT, R_IN = 1.0, 0.60
-    zones = [
-        (180, 135, "#C0392B", "Critical"),
-        (135,  90, "#E67E22", "Poor"),
-        ( 90,  45, "#F4D03F", "Fair"),
-        ( 45,   0, "#27AE60", "Good"),
-    ]
-
-    for a0, a1, col, lbl in zones:
-        th = np.linspace(np.radians(a0), np.radians(a1), 120)
-        xo, yo = R_OUT * np.cos(th), R_OUT * np.sin(th)
-        xi, yi = R_IN  * np.cos(th), R_IN  * np.sin(th)
-        ax.fill(np.concatenate([xo, xi[::-1]]),
-                np.concatenate([yo, yi[::-1]]),
-                color=col, alpha=0.88, zorder=2, linewidth=0)
-        mid = np.radians((a0 + a1) / 2)
-        rm  = (R_IN + R_OUT) / 2
-        ax.text(rm * np.cos(mid), rm * np.sin(mid), lbl,
-                ha="center", va="center", fontsize=6.2,
-                color="white", fontweight="bold",
-                rotation=(a0 + a1) / 2 - 90, zorder=5)
-
-    # divider gaps
-    for deg in [135, 90, 45]:
-        rd = np.radians(deg)
-        ax.plot([R_IN * np.cos(rd), R_OUT * np.cos(rd)],
-                [R_IN * np.sin(rd), R_OUT * np.sin(rd)],
-                color=CHART_BG, linewidth=3.5, zorder=4)
-
-    # inner fill
-    th2 = np.linspace(0, np.pi, 200)
-    ax.fill(np.concatenate([R_IN * np.cos(th2), [0]]),
-            np.concatenate([R_IN * np.sin(th2), [0]]),
-            color="#0D1525", zorder=3)
-
-    # tick labels
-    for deg, lbl in [(180, "0"), (135, "25"), (90, "50"), (45, "75"), (0, "100")]:
-        rd = np.radians(deg)
-        tx = (R_OUT + 0.15) * np.cos(rd)
-        ty = (R_OUT + 0.15) * np.sin(rd)
-        ha = "right" if deg > 91 else ("left" if deg < 89 else "center")
-        ax.text(tx, ty, lbl, ha=ha, va="center",
-                fontsize=6.5, color="#2D5A78", fontfamily="monospace")
-
-    # needle
-    needle_deg = 180 - (score / 100) * 180
-    nd = np.radians(needle_deg)
-    NL = 0.80
-    ax.plot([0, NL * np.cos(nd)], [0, NL * np.sin(nd)],
-            color="#FFFFFF", linewidth=2.8, solid_capstyle="round", zorder=7)
-    ax.plot(NL * np.cos(nd), NL * np.sin(nd),
-            "o", color="#00D4FF", markersize=5.5, zorder=8)
-    ax.plot(0, 0, "o", color="#00D4FF", markersize=13, zorder=9)
-    ax.plot(0, 0, "o", color="#0D1525", markersize=8,  zorder=10)
-
-    # score readout
-    ax.text(0, 0.31, f"{score:.1f}%",
-            ha="center", va="center",
-            fontsize=18, fontweight="800",
-            color="#00D4FF", fontfamily="monospace", zorder=11)
-    ax.text(0, 0.12, "Marine Health Score",
-            ha="center", va="center",
-            fontsize=6.2, color="#2D5A78",
-            fontfamily="monospace", zorder=11)
-
-    ax.set_xlim(-1.40, 1.40)
-    ax.set_ylim(-0.20, 1.32)
-    ax.set_title("Health Gauge", color="#C5DEF8",
-                 fontsize=10.5, fontweight="bold", pad=8)
-    plt.tight_layout(pad=0.5)
-    return _savefig(fig)
-
-
-def chart_recovery(R: dict) -> io.BytesIO:
-    """Marine Recovery Simulation — logistic growth curves."""
-    months = np.linspace(0, 50, 300)
-    boost  = R["health"] / 100.0
-
-    def logi(t, L, k, t0):
-        return L / (1 + np.exp(-k * (t - t0)))
-
-    eco = {
-        "Coral Reef":      (dict(L=0.88, k=0.18, t0=8),  dict(L=0.98, k=0.22, t0=6),  "#90CAF9", "#42A5F5"),
-        "Seagrass Meadow": (dict(L=0.80, k=0.13, t0=12), dict(L=0.95, k=0.17, t0=9),  "#A5D6A7", "#66BB6A"),
-        "Mangrove Forest": (dict(L=0.72, k=0.10, t0=16),
-                            dict(L=min(0.88 + boost * 0.5, 1.0), k=0.13, t0=12),
-                            "#CE93D8", "#AB47BC"),
-    }
-
-    fig, ax = plt.subplots(figsize=(10, 5.2))
-    fig.patch.set_facecolor(CHART_BG)
-    ax.set_facecolor(CHART_BG)
-
-    legend_lines, legend_labels = [], []
-    for name, (bp, ip, cb, ci) in eco.items():
-        yb = logi(months, **bp)
-        yi = np.clip(logi(months, **ip) * (1 + boost * 0.15), 0, 1)
-        lb, = ax.plot(months, yb, "--", lw=1.8, color=cb, alpha=0.75)
-        li, = ax.plot(months, yi, "-",  lw=2.5, color=ci)
-        ax.fill_between(months, yb, yi, color=ci, alpha=0.07)
-        legend_lines  += [lb, li]
-        legend_labels += [f"{name} — Baseline", f"{name} — Improved"]
-
-    ax.axhline(1.0, color="#FFFFFF", alpha=0.06, lw=1, ls=":")
-    ax.text(49, 1.013, "Full Recovery",
-            color="#2D5A78", fontsize=7.5, ha="right", fontfamily="monospace")
-
-    ax.text(
-        0.015, 0.97,
-        f"  Health Boost  +{R['health']:.0f}%  ",
-        transform=ax.transAxes, ha="left", va="top",
-        fontsize=8.5, color="#00D4FF", fontfamily="monospace",
-        bbox=dict(facecolor=(0.024, 0.118, 0.188, 0.85),
-                  edgecolor=(0.0, 0.83, 1.0, 0.4),
-                  boxstyle="round,pad=0.45", linewidth=1),
-    )
+    def lines():
+        stats = {name: c.stats() for name, c in caches.items()}
+        out = []
+        for key, metric, kind, help_ in CACHE_SERIES:
+            out += [f"# HELP {metric} {help_}", f"# TYPE {metric} {kind}"]
+            out += [f'{metric}{{cache="{name}"}} {stat[key]}' for name, stat in stats.items()]
+        return out
 
-    ax.legend(legend_lines, legend_labels,
-              loc="lower right", ncol=1, frameon=True,
-              framealpha=0.10, edgecolor=(1.0, 1.0, 1.0, 0.07),
-              facecolor="#080E17", fontsize=8, labelcolor="#4A7A96")
+    timing.add_collector(lines)
 
-    ax.set_xlim(0, 50); ax.set_ylim(0, 1.10)
-    ax.set_xlabel("Time (Months)",  color="#2D5A78", fontsize=9.5, labelpad=8)
-    ax.set_ylabel("Recovery Level", color="#2D5A78", fontsize=9.5, labelpad=8)
-    ax.set_title(f"Marine Recovery Simulation  ·  Boost: {R['health']:.0f}%",
-                 color="#C5DEF8", fontsize=11.5, fontweight="bold", pad=16, loc="left")
-    ax.tick_params(axis="x", colors="#2D5A78", labelsize=8.5)
-    ax.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
-    ax.grid(color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
 
-    for spine in ["top", "right"]:
-        ax.spines[spine].set_visible(False)
-    for spine in ["left", "bottom"]:
-        ax.spines[spine].set_edgecolor((1.0, 1.0, 1.0, 0.07))
-        ax.spines[spine].set_linewidth(0.8)
+def bind_session_timings():
+    """Also aggregate this run's stage timings into the session's own Timings."""
+    timing.bind(st.session_state.setdefault("timings", timing.Timings()))
 
-    plt.tight_layout(pad=1.6)
-    return _savefig(fig)
 
+def _diagnostics_toggled():
+    # each session holds timing on while its toggle is; the last one off stops it
+    if not st.session_state["diagnostics"]:
+        hold = st.session_state.pop("timing_hold", None)
+        if hold is not None:
+            hold.release()
 
-# ──────────────────────────────────────────────────────────────────────────────
-# ── STATUS HELPER ─────────────────────────────────────────────────────────────
-# ──────────────────────────────────────────────────────────────────────────────
-def get_status(score):
-    if score >= 65:
-        return "alert-good",    "✅", "Good Health",
-    elif score >= 35:
-        return "alert-warning", "⚠️", "Moderate Stress"
-    else:
-        return "alert-danger",  "🚨", "Critical Condition"
 
+def render_diagnostics(panel):
+    """Per-session and per-process stage timings, slowest total first, then cache counters."""
+    fmt = {c: st.column_config.NumberColumn(format="%.1f")
+           for c in ("mean_ms", "max_ms", "total_ms")}
+    with panel.container():
+        for label, t in (("This session", st.session_state["timings"]),
+                         ("Server process", timing.PROCESS)):
+            st.caption(label)
+            st.dataframe(t.rows(), hide_index=True, width="stretch", column_config=fmt)
+        st.caption("Process caches")
+        rows = []
+        for name, cache in process_caches().items():
+            c = cache.stats()
+            looked_up = c["hits"] + c["misses"]
+            rows.append({"cache": name, "entries": c["entries"], "mb": c["bytes"] / 1e6,
+                         "hits": c["hits"], "misses": c["misses"],
+                         "hit_rate": 100 * c["hits"] / looked_up if looked_up else None})
+        st.dataframe(rows, hide_index=True, width="stretch", column_config={
+            "mb": st.column_config.NumberColumn("MB", format="%.1f"),
+            "hit_rate": st.column_config.NumberColumn("hit %", format="%.0f")})
+        if st.button("Reset session timings", key="timings_reset"):
+            st.session_state["timings"].reset()
+            st.rerun()
 
-def get_status_desc(score):
-    if score >= 65:
-        return "Ecosystem conditions are stable. Reef biodiversity appears well-maintained."
-    elif score >= 35:
-        return "Ecosystem shows signs of environmental stress. Monitoring recommended."
-    else:
-        return "Severe degradation detected. Immediate intervention may be required."
+
+metrics_server()
+cache_metrics()
+bind_session_timings()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -825,18 +896,19 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
-    st.markdown('<div class="sidebar-section-title">📂 Upload Images (up to 5)</div>',
+    st.markdown('<div class="sidebar-section-title">📂 Upload Images</div>',
                 unsafe_allow_html=True)
     uploaded_files = st.file_uploader(
         "Reef images",
         type=["jpg", "jpeg", "png", "webp"],
         accept_multiple_files=True,
         label_visibility="collapsed",
-        help="Upload up to 5 underwater reef photos for spectral analysis",
+        help="Upload one or more underwater reef photos for spectral analysis",
     )
-    if uploaded_files and len(uploaded_files) > 5:
-        st.warning("⚠️ Maximum 5 images at a time. Only the first 5 will be analysed.")
-        uploaded_files = uploaded_files[:5]
+    site = st.text_input(
+        "Site tag", key="site", placeholder="Site tag (optional)", label_visibility="collapsed",
+        help="Stored with each new result in the local results database",
+    ).strip() or None
 
     st.markdown('<div class="sidebar-section-title">ℹ️ Detection Method</div>',
                 unsafe_allow_html=True)
@@ -849,23 +921,19 @@ with st.sidebar:
 
     st.markdown('<div class="sidebar-section-title">🎯 Thresholds</div>',
                 unsafe_allow_html=True)
-    st.markdown("""
+    # Moving a slider only re-scores each upload's cached colour histogram;
+    # no image is decoded or re-classified.
+    f_bleach = st.slider("🪸 Bleaching · R, G, B >", 0.50, 0.99, 0.80, 0.01, key="th_bleach")
+    f_algae  = st.slider("🌿 Algae · G >",           0.05, 0.95, 0.45, 0.01, key="th_algae")
+    f_sed_r  = st.slider("🟫 Sediment · R >",        0.05, 0.95, 0.40, 0.01, key="th_sed_r")
+    f_sed_b  = st.slider("🟫 Sediment · B <",        0.05, 0.95, 0.30, 0.01, key="th_sed_b")
+    thresholds = thresholds_from_fractions(round(f_bleach, 2), round(f_algae, 2),
+                                           round(f_sed_r, 2), round(f_sed_b, 2))
+    st.markdown(f"""
     <div style="padding: 0.2rem 0;">
-      <div class="stat-row">
-        <span class="stat-label">🪸 Bleaching</span>
-        <span class="stat-value">R,G,B > 0.80</span>
-      </div>
-      <div class="stat-row">
-        <span class="stat-label">🌿 Algae</span>
-        <span class="stat-value">G > 0.45</span>
-      </div>
-      <div class="stat-row">
-        <span class="stat-label">🟫 Sediment</span>
-        <span class="stat-value">R > 0.40, B < 0.30</span>
-      </div>
       <div class="stat-row">
         <span class="stat-label">🖼 Resize</span>
-        <span class="stat-value">500 × 500 px</span>
+        <span class="stat-value">{RESIZE_TO[0]} × {RESIZE_TO[1]} px</span>
       </div>
     </div>
     """, unsafe_allow_html=True)
@@ -880,6 +948,22 @@ with st.sidebar:
       <div class="stat-row"><span class="stat-label">Recovery Sim</span><span class="stat-value">50-month</span></div>
     </div>
     """, unsafe_allow_html=True)
+    chart_backend = st.radio(
+        "Chart renderer", list(CHART_BACKENDS), key="chart_backend", horizontal=True,
+        help="Vega-Lite charts are drawn by the browser from a few KB of JSON; "
+             "PNG charts are rasterised on the server with matplotlib.",
+    )
+
+    st.markdown('<div class="sidebar-section-title">⏱ Diagnostics</div>',
+                unsafe_allow_html=True)
+    diagnostics = st.toggle(
+        "Stage timings", key="diagnostics", on_change=_diagnostics_toggled,
+        help="Times decode, resize, classification, charts and report HTML. "
+             "Turning it on enables timing for the whole server process.",
+    )
+    if diagnostics and "timing_hold" not in st.session_state:
+        st.session_state["timing_hold"] = timing.Hold()
+    diag_panel = st.empty()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -929,198 +1013,30 @@ def info_icon(title: str, body: str) -> str:
     )
 
 
-# ── Analyst-style report generators (reads like a marine biologist's report) ──
-
-def explain_bar(R):
-    b, a, s, h = R["bleach"], R["algae"], R["sediment"], R["health"]
-
-    # --- Bleaching interpretation ---
-    if b > 40:
-        bleach_txt = (f"Coral bleaching has reached a <b style='color:#90CAF9'>critical {b:.1f}%</b>. "
-                      f"This level indicates mass thermal stress — the coral polyps have expelled their symbiotic algae and are at high risk of mortality if conditions do not improve within weeks.")
-    elif b > 20:
-        bleach_txt = (f"Bleaching is at a <b style='color:#90CAF9'>concerning {b:.1f}%</b>. "
-                      f"A significant portion of the reef structure is under stress. Prolonged exposure to the current conditions will likely push this into a critical range.")
-    elif b > 8:
-        bleach_txt = (f"Mild bleaching detected at <b style='color:#90CAF9'>{b:.1f}%</b>. "
-                      f"While not immediately alarming, this is an early warning that temperature or water quality stress is present.")
-    else:
-        bleach_txt = (f"Bleaching is minimal at <b style='color:#90CAF9'>{b:.1f}%</b> — "
-                      f"coral polyps appear largely healthy and pigmented.")
-
-    # --- Algae interpretation ---
-    if a > 40:
-        algae_txt = (f"Algae bloom coverage at <b style='color:#69F0AE'>{a:.1f}%</b> is aggressive. "
-                     f"Dense algae is actively competing with and smothering coral tissue, blocking sunlight and consuming oxygen in the water column.")
-    elif a > 20:
-        algae_txt = (f"Algae at <b style='color:#69F0AE'>{a:.1f}%</b> is moderate-to-high. "
-                     f"Nutrient enrichment (often from runoff) is likely fuelling this growth. Left unchecked it will outcompete coral for space.")
-    elif a > 8:
-        algae_txt = (f"Algae presence is low-moderate at <b style='color:#69F0AE'>{a:.1f}%</b>. "
-                     f"This is within a manageable range but should be monitored for upward trends.")
-    else:
-        algae_txt = (f"Algae is well-controlled at <b style='color:#69F0AE'>{a:.1f}%</b> — "
-                     f"a healthy grazer fish population is likely keeping growth in check.")
-
-    # --- Sediment interpretation ---
-    if s > 30:
-        sediment_txt = (f"Sediment turbidity is <b style='color:#FFCC80'>very high at {s:.1f}%</b>. "
-                        f"This level drastically reduces light penetration, suffocates coral polyps, and signals significant erosion or disturbance upstream.")
-    elif s > 15:
-        sediment_txt = (f"Sediment at <b style='color:#FFCC80'>{s:.1f}%</b> is elevated. "
-                        f"Visibility is being reduced and coral growth rates are likely suppressed. Investigate for nearby construction, dredging, or storm runoff.")
-    else:
-        sediment_txt = (f"Sediment levels are low at <b style='color:#FFCC80'>{s:.1f}%</b> — "
-                        f"water clarity appears good, supporting adequate light for photosynthesis.")
-
-    # --- Overall verdict ---
-    if h >= 65:
-        verdict = f"<b style='color:#27AE60'>Overall the reef is in good health ({h:.1f}%).</b> Stressor levels are within acceptable bounds. Routine monitoring is sufficient."
-    elif h >= 35:
-        verdict = f"<b style='color:#F4D03F'>Overall health is moderate ({h:.1f}%).</b> The combination of stressors above is having a measurable impact. A targeted conservation plan is recommended."
-    else:
-        verdict = f"<b style='color:#C0392B'>Overall health is critically low ({h:.1f}%).</b> Multiple stressors are compounding each other. Immediate scientific assessment and intervention are strongly advised."
-
-    return f"{bleach_txt}<br><br>{algae_txt}<br><br>{sediment_txt}<br><br>{verdict}"
-
-
-def explain_donut(R):
-    b, a, s, h = R["bleach"], R["algae"], R["sediment"], R["health"]
-    total_stress = b + a + s
-
-    if h >= 65:
-        composition_txt = (
-            f"The composition chart confirms a predominantly healthy reef ecosystem. "
-            f"<b style='color:#00D4FF'>{h:.1f}%</b> of the image represents unimpacted, healthy water and coral — "
-            f"the dominant slice by a clear margin. The remaining {total_stress:.1f}% split across stressors "
-            f"is within the natural variation expected in a functioning reef system."
-        )
-        action = "Continue regular monitoring. No urgent intervention required."
-    elif h >= 35:
-        composition_txt = (
-            f"The donut reveals a reef under measurable stress. Healthy water accounts for only "
-            f"<b style='color:#00D4FF'>{h:.1f}%</b> of the composition, while combined stressors "
-            f"(bleaching {b:.1f}% + algae {a:.1f}% + sediment {s:.1f}%) consume <b>{total_stress:.1f}%</b> — "
-            f"more than a third of the ecosystem is compromised. The balance is shifting away from coral dominance."
-        )
-        action = "Localised intervention, water quality testing, and increased monitoring frequency are recommended."
-    else:
-        composition_txt = (
-            f"The composition tells a stark story: stressors account for <b style='color:#C0392B'>{total_stress:.1f}%</b> "
-            f"of the ecosystem while healthy water has collapsed to just <b style='color:#00D4FF'>{h:.1f}%</b>. "
-            f"This inversion — where damage outweighs health — is a hallmark of a reef in ecological crisis. "
-            f"Bleaching ({b:.1f}%), algae ({a:.1f}%), and sediment ({s:.1f}%) are all contributing to a cascading decline."
-        )
-        action = "Urgent scientific assessment and active restoration (coral transplanting, algae removal, runoff control) are critically needed."
-
-    return f"{composition_txt}<br><br>⚡ <b>Recommended Action:</b> {action}"
-
-
-def explain_gauge(R):
-    h = R["health"]
-
-    if h >= 75:
-        reading = (
-            f"The gauge needle sits firmly in the <b style='color:#27AE60'>Good zone at {h:.1f}%</b>. "
-            f"This score reflects a reef where ecological processes are functioning well — "
-            f"coral growth is outpacing mortality, grazers are controlling algae, and water quality is supporting photosynthesis. "
-            f"Reefs in this range show strong resilience and can recover from minor disturbances on their own."
-        )
-        outlook = "Outlook is positive. Maintain current water quality and minimise human disturbance to preserve this score."
-    elif h >= 50:
-        reading = (
-            f"The needle falls in the <b style='color:#F4D03F'>Fair zone at {h:.1f}%</b>. "
-            f"The reef is functional but showing signs of strain. At this score, coral recruitment may be slowing, "
-            f"and the ecosystem's ability to self-repair after bleaching events or storms is reduced. "
-            f"It is not in crisis, but it is trending in the wrong direction if stressors are not addressed."
-        )
-        outlook = "Outlook is cautious. Water quality management and reduction of local stressors (fishing pressure, runoff) are needed to prevent further decline."
-    elif h >= 25:
-        reading = (
-            f"The needle points to the <b style='color:#E67E22'>Poor zone at {h:.1f}%</b>. "
-            f"This score indicates significant ecological degradation. Coral cover is likely declining, "
-            f"algae is gaining dominance, and biodiversity is shrinking. The reef's natural recovery mechanisms "
-            f"are overwhelmed — passive conservation alone will not be sufficient."
-        )
-        outlook = "Outlook is concerning. Active intervention — including coral nursery programs, algae removal, and strict no-take zones — should be implemented urgently."
-    else:
-        reading = (
-            f"The needle has dropped into the <b style='color:#C0392B'>Critical zone at {h:.1f}%</b>. "
-            f"This represents near-total ecological collapse in the scanned area. "
-            f"At this level, coral framework destruction is advanced, biodiversity has crashed, "
-            f"and natural recovery without direct human intervention is considered unlikely within any reasonable timeframe."
-        )
-        outlook = "Outlook is severe. Emergency reef restoration protocols should be activated. Document the site for scientific record and prioritise stabilisation."
-
-    return f"{reading}<br><br>🔭 <b>Outlook:</b> {outlook}"
-
-
-def explain_recovery(R):
-    h = R["health"]
-    boost = h / 100.0
-
-    if h >= 65:
-        trajectory = (
-            f"With a health score of <b style='color:#00D4FF'>{h:.1f}%</b>, the simulation projects a <b>strong recovery trajectory</b>. "
-            f"The solid lines (boosted path) rise noticeably above the dashed baseline across all three ecosystems — "
-            f"Coral Reef, Seagrass Meadow, and Mangrove Forest. This gap represents the real-world benefit "
-            f"of maintaining current health levels. Coral Reef recovery is projected to approach near-full levels "
-            f"within 30–40 months under these conditions."
-        )
-        recommendation = (
-            f"The reef has strong natural recovery capacity. Protecting this site from new stressors "
-            f"(overfishing, pollution, anchor damage) will allow the projected recovery to materialise."
-        )
-    elif h >= 35:
-        trajectory = (
-            f"At <b style='color:#00D4FF'>{h:.1f}%</b> health, the simulation shows a <b>moderate recovery gap</b> "
-            f"between the dashed baseline and solid boosted lines. Recovery is possible, but it will be slower "
-            f"and more fragile than a healthy reef. The Mangrove Forest curve in particular shows limited uplift "
-            f"at this health level — mangroves require stable, low-stress conditions to regenerate effectively. "
-            f"Without improvement, the solid lines may converge back toward the baseline within 20–30 months."
-        )
-        recommendation = (
-            f"Active support is needed to widen the recovery gap — water quality improvement, "
-            f"reducing sedimentation, and supplementing natural recruitment with coral transplanting."
-        )
-    else:
-        trajectory = (
-            f"At a critically low health score of <b style='color:#00D4FF'>{h:.1f}%</b>, the simulation paints a difficult picture. "
-            f"The gap between the dashed baseline and solid lines is very narrow — meaning the ecosystem has "
-            f"little capacity to recover beyond its already-degraded baseline. All three ecosystems "
-            f"(Coral Reef, Seagrass, Mangrove) show suppressed recovery curves, and full recovery "
-            f"within the 50-month window is unlikely without major external intervention."
-        )
-        recommendation = (
-            f"Natural recovery alone is insufficient at this health level. "
-            f"Structured restoration programmes — coral seeding, nutrient runoff control, and enforced marine protection — "
-            f"are required to shift the trajectory upward."
-        )
-
-    return f"{trajectory}<br><br>📋 <b>Recommendation:</b> {recommendation}"
-
-
 # ── helper to render one full image report ────────────────────────────────
-def render_report(uf, pil_image, R, idx):
-    """Render the full analysis report for a single image."""
+LEGEND_HTML = " &nbsp;".join(
+    f'<span style="color:rgb({r},{g},{b});font-weight:600;">● {name}</span>'
+    for (r, g, b), name in zip(PALETTE[1:].tolist(), ["Bleaching", "Algae", "Sediment"])
+)
 
-    # Status alert
-    cls, icon, title = get_status(R["health"])
-    desc = get_status_desc(R["health"])
-    st.markdown(f"""
-    <div class="alert {cls}">
-      <div class="alert-icon">{icon}</div>
+
+def status_alert(rep, R: dict) -> str:
+    """Status banner: icon, verdict and health score."""
+    return f"""
+    <div class="alert {rep.status_cls}">
+      <div class="alert-icon">{rep.icon}</div>
       <div>
-        <div class="alert-title">{title}</div>
-        <div class="alert-desc">{desc}</div>
+        <div class="alert-title">{rep.title}</div>
+        <div class="alert-desc">{rep.desc}</div>
       </div>
       <div class="alert-score">{R["health"]:.1f}%</div>
     </div>
-    """, unsafe_allow_html=True)
+    """
 
-    # KPI cards
-    section_head(f"01 · Detection Metrics")
-    st.markdown(f"""
+
+def kpi_grid(R: dict) -> str:
+    """The four metric cards."""
+    return f"""
     <div class="kpi-grid">
       <div class="kpi-card kc-bleach">
         <div class="kpi-stripe"></div><div class="kpi-glow"></div>
@@ -1155,11 +1071,27 @@ def render_report(uf, pil_image, R, idx):
         <div class="kpi-footer">Overall ecosystem index</div>
       </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+
+def render_report(uf, up, R, idx, th=DEFAULT_THRESHOLDS):
+    """Render the full analysis report for a single image."""
+    dec = up.dec
+
+    with stage("report.text"):
+        rep = build_report(R)
+
+    with stage("report.html"):
+        # Status alert
+        st.markdown(status_alert(rep, R), unsafe_allow_html=True)
+
+        # KPI cards
+        section_head(f"01 · Detection Metrics")
+        st.markdown(kpi_grid(R), unsafe_allow_html=True)
 
     # Image + bar chart
     section_head("02 · Image & Coverage Analysis")
-    col_img, col_bar = st.columns([1, 1.7], gap="large")
+    col_img, col_ovl, col_bar = st.columns([1, 1, 1.7], gap="large")
     with col_img:
         st.markdown(f"""
         <div class="img-panel">
@@ -1167,11 +1099,24 @@ def render_report(uf, pil_image, R, idx):
             <span class="img-panel-title">📷 &nbsp;Uploaded Image</span>
             <span class="chart-badge">Input</span>
           </div>""", unsafe_allow_html=True)
-        st.image(pil_image, use_container_width=True)
+        st.image(dec.rgb, width="stretch")
         st.markdown(f"""
           <div class="img-panel-footer">
             <span>{uf.name}</span>
-            <span>{pil_image.width} × {pil_image.height} px</span>
+            <span>{dec.full_size[0]} × {dec.full_size[1]} px{f" · decoded at 1/{dec.scale}" if dec.scale > 1 else ""} · {dec.decode_ms:.0f} ms</span>
+          </div>
+        </div>""", unsafe_allow_html=True)
+    with col_ovl:
+        st.markdown("""
+        <div class="img-panel">
+          <div class="img-panel-header">
+            <span class="img-panel-title">🗺 &nbsp;Detection Overlay</span>
+            <span class="chart-badge">Labels</span>
+          </div>""", unsafe_allow_html=True)
+        st.image(upload_overlay(up, th), width="stretch")
+        st.markdown(f"""
+          <div class="img-panel-footer">
+            <span>{LEGEND_HTML}</span>
           </div>
         </div>""", unsafe_allow_html=True)
     with col_bar:
@@ -1185,12 +1130,12 @@ def render_report(uf, pil_image, R, idx):
                 <div class="info-icon">i</div>
                 <div class="info-tooltip">
                   <strong>📊 Coverage Analysis</strong>
-                  {explain_bar(R)}
+                  {rep.bar}
                 </div>
               </div>
             </div>
           </div>""", unsafe_allow_html=True)
-        st.image(chart_bar(R), use_container_width=True)
+        show_chart(chart_bar, R)
         st.markdown("""
           <div class="chart-panel-footer">
             <span>Vertical bars show pixel coverage per category</span>
@@ -1212,12 +1157,12 @@ def render_report(uf, pil_image, R, idx):
                 <div class="info-icon">i</div>
                 <div class="info-tooltip">
                   <strong>🥧 Ecosystem Composition</strong>
-                  {explain_donut(R)}
+                  {rep.donut}
                 </div>
               </div>
             </div>
           </div>""", unsafe_allow_html=True)
-        st.image(chart_donut(R), use_container_width=True)
+        show_chart(chart_donut, R)
         st.markdown("""
           <div class="chart-panel-footer">
             <span>Proportional breakdown of all detected categories</span>
@@ -1234,12 +1179,12 @@ def render_report(uf, pil_image, R, idx):
                 <div class="info-icon">i</div>
                 <div class="info-tooltip">
                   <strong>🎯 Health Gauge</strong>
-                  {explain_gauge(R)}
+                  {rep.gauge}
                 </div>
               </div>
             </div>
           </div>""", unsafe_allow_html=True)
-        st.image(chart_gauge(R), use_container_width=True)
+        show_chart(chart_gauge, R)
         st.markdown("""
           <div class="chart-panel-footer">
             <span style="color:#C0392B;font-weight:600;">● Critical 0–25</span>&nbsp;&nbsp;
@@ -1261,22 +1206,70 @@ def render_report(uf, pil_image, R, idx):
                 <div class="info-icon">i</div>
                 <div class="info-tooltip">
                   <strong>📈 Marine Recovery Simulation</strong>
-                  {explain_recovery(R)}
+                  {rep.recovery}
                 </div>
               </div>
             </div>
       </div>""", unsafe_allow_html=True)
-    st.image(chart_recovery(R), use_container_width=True)
+    show_chart(chart_recovery, R)
     st.markdown(f"""
       <div class="chart-panel-footer">
-        <span>Dashed = Baseline &nbsp;|&nbsp; Solid = Improved with health boost</span>
+        <span>Dashed = Baseline &nbsp;|&nbsp; Solid = Improved &nbsp;|&nbsp; Shaded = 25–75% and 10–90% of {SCENARIOS:,} scenarios</span>
         <span>Boost derived from Health Score: {R["health"]:.1f}%</span>
       </div>
     </div>""", unsafe_allow_html=True)
 
     # Raw data
     section_head("05 · Raw Detection Data")
-    with st.expander("🔬 &nbsp;View full precision values"):
+    raw_data_panel(R, idx)
+
+
+def render_preview(R: dict):
+    """Alert and KPI cards from the thumbnail, shown while the full analysis runs."""
+    st.markdown(status_alert(build_report(R), R), unsafe_allow_html=True)
+    section_head("01 · Detection Metrics · Preview")
+    st.markdown(kpi_grid(R), unsafe_allow_html=True)
+    st.markdown(f"""
+    <div class="chart-panel" style="text-align:center;color:#6B93AF;font-size:0.8rem;">
+      ⏳ &nbsp;Preview from a {THUMB_SIZE[0]}×{THUMB_SIZE[1]} thumbnail — full-resolution
+      results and charts replace it as soon as the analysis finishes.
+    </div>""", unsafe_allow_html=True)
+
+
+def report_progressive(uf, idx: int, th: Thresholds, site: str = None):
+    """Render one report, with thumbnail KPIs in its place while the image is analysed.
+
+    The full analysis always runs as an ingest job; the thumbnail takes a few
+    milliseconds on the script thread, and the finished report replaces it in
+    the same slot.
+    """
+    h = upload_hash(uf)
+    cache, pool = result_cache(), ingest_pool()
+    job = pool.pending(h)
+    if job is None and (h, RESIZE_TO) not in cache:
+        job = pool.submit(h, decode_upload, h, uf.getvalue(), uf.name, th, site, cache, result_store())
+    slot = st.empty()
+    if job is not None and not job.done():
+        R0 = analyze_thumbnail(io.BytesIO(uf.getvalue()), th)
+        if not job.done():
+            with slot.container():
+                if R0 is not None:
+                    render_preview(R0)
+                else:
+                    st.markdown(f"⏳ Analysing **{uf.name}** …")
+    R, up = analyze_upload(uf, th, site)
+    with slot.container():
+        render_report(uf, up, R, idx, th)
+
+
+@st.fragment
+def raw_data_panel(R: dict, idx: int):
+    """Full-precision metrics; toggling the expander reruns only this fragment."""
+    exp = st.expander("🔬 &nbsp;View full precision values",
+                      key=f"raw_{idx}", on_change="rerun")
+    if not exp.open:
+        return
+    with exp:
         st.markdown("<br>", unsafe_allow_html=True)
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("🪸 Bleaching",          f'{R["bleach"]:.2f}%')
@@ -1286,125 +1279,198 @@ def render_report(uf, pil_image, R, idx):
         st.markdown("<br>", unsafe_allow_html=True)
 
 
+COMPARE_PAGE = 10      # health cards (and bar groups) per page
+TAB_LIMIT = 8          # above this many uploads, reports are picked from a list
+
+CARD_SORTS = {
+    "Lowest health first":  lambda names, v: np.argsort(v[:, 3], kind="stable"),
+    "Highest health first": lambda names, v: np.argsort(-v[:, 3], kind="stable"),
+    "Upload order":         lambda names, v: np.arange(len(names)),
+    "File name":            lambda names, v: np.argsort(np.array(names, dtype=object), kind="stable"),
+}
+
+
+def health_card(name: str, health: float) -> str:
+    cls, icon, title = get_status(health)
+    return f"""
+    <div class="chart-panel" style="text-align:center;padding:1rem 0.5rem;">
+      <div style="font-size:1.6rem;margin-bottom:0.3rem;">{icon}</div>
+      <div style="font-size:0.7rem;color:#6B93AF;font-family:monospace;
+                  margin-bottom:0.5rem;white-space:nowrap;overflow:hidden;
+                  text-overflow:ellipsis;" title="{name}">{name[:20]}</div>
+      <div style="font-size:2rem;font-weight:800;color:#00D4FF;
+                  font-family:monospace;line-height:1;">{health:.1f}<span style="font-size:0.9rem">%</span></div>
+      <div style="font-size:0.65rem;color:#3A6580;margin-top:0.2rem;">Health Score</div>
+      <div style="height:4px;background:rgba(255,255,255,0.05);
+                  border-radius:2px;margin:0.7rem 0.5rem 0;overflow:hidden;">
+        <div style="height:100%;width:{min(health,100)}%;
+                    background:linear-gradient(90deg,#005B7F,#00D4FF);
+                    border-radius:2px;"></div>
+      </div>
+    </div>"""
+
+
+def percentile_table(summary: dict) -> str:
+    """HTML table: mean and P5..P95 for each metric."""
+    labels = {"bleach": "🪸 Bleaching", "algae": "🌿 Algae", "sediment": "🟫 Sediment",
+              "health": "💧 Health"}
+    head = "".join(f"<th>P{p}</th>" for p in next(iter(summary["percentiles"].values())))
+    rows = "".join(
+        f"<tr><td>{labels[m]}</td><td>{summary['mean'][m]:.1f}</td>"
+        + "".join(f"<td>{v:.1f}</td>" for v in summary["percentiles"][m].values()) + "</tr>"
+        for m in METRICS)
+    return f"""
+    <table style="width:100%;font-family:monospace;font-size:0.78rem;color:#B0CCDE;
+                  border-collapse:collapse;text-align:right;">
+      <tr style="color:#4A7A96;"><th style="text-align:left;">Metric (%)</th><th>Mean</th>{head}</tr>
+      {rows}
+    </table>"""
+
+
 # ── MAIN RENDER ──────────────────────────────────────────────────────────────
-if uploaded_files:
-    # ── Summary comparison bar (shown only when >1 image) ────────────────────
-    if len(uploaded_files) > 1:
-        section_head("🌐 · Multi-Image Comparison Overview")
-
-        all_results = []
-        for uf in uploaded_files:
-            img = Image.open(uf)
-            all_results.append((uf.name, analyze_image(img)))
-
-        # Comparison table
-        cols = st.columns(len(all_results))
-        for col, (name, R) in zip(cols, all_results):
-            cls, icon, title = get_status(R["health"])
-            col.markdown(f"""
-            <div class="chart-panel" style="text-align:center;padding:1rem 0.5rem;">
-              <div style="font-size:1.6rem;margin-bottom:0.3rem;">{icon}</div>
-              <div style="font-size:0.7rem;color:#6B93AF;font-family:monospace;
-                          margin-bottom:0.5rem;white-space:nowrap;overflow:hidden;
-                          text-overflow:ellipsis;">{name[:20]}</div>
-              <div style="font-size:2rem;font-weight:800;color:#00D4FF;
-                          font-family:monospace;line-height:1;">{R["health"]:.1f}<span style="font-size:0.9rem">%</span></div>
-              <div style="font-size:0.65rem;color:#3A6580;margin-top:0.2rem;">Health Score</div>
-              <div style="height:4px;background:rgba(255,255,255,0.05);
-                          border-radius:2px;margin:0.7rem 0.5rem 0;overflow:hidden;">
-                <div style="height:100%;width:{min(R["health"],100)}%;
-                            background:linear-gradient(90deg,#005B7F,#00D4FF);
-                            border-radius:2px;"></div>
-              </div>
-            </div>""", unsafe_allow_html=True)
+# The overview and the report tabs are fragments: a widget inside one (tab
+# switch, expander) reruns just that fragment with the files and thresholds it
+# was last given, not the CSS/JS injection, sidebar and the other fragment.
+# Sidebar widgets still rerun the whole script since everything depends on them.
+@st.fragment
+def comparison_overview(files, th, site=None):
+    """Survey aggregates, a sortable results table and paged health cards.
+
+    Per-image work happens once per upload set (survey_results); a rerun only
+    summarises a cached (n, 4) array and draws one page, so render time stays
+    flat as the number of images grows.
+    """
+    bind_session_timings()
+    names, values = survey_results(files, th, site)
+    summary = survey_summary(values)
+    band = summary["status"]
+
+    section_head("🌐 · Multi-Image Comparison Overview")
+    st.markdown(f"""
+    <div class="kpi-grid">
+      {health_card(f"{summary['n']} images · mean", summary["mean"]["health"])}
+      {health_card("median image", summary["percentiles"]["health"][50])}
+      <div class="chart-panel" style="padding:1rem;grid-column:span 2;">
+        <div class="stat-row"><span class="stat-label">✅ Good health (≥ 65%)</span><span class="stat-value">{band["good"]}</span></div>
+        <div class="stat-row"><span class="stat-label">⚠️ Moderate stress (35–65%)</span><span class="stat-value">{band["moderate"]}</span></div>
+        <div class="stat-row"><span class="stat-label">🚨 Critical (&lt; 35%)</span><span class="stat-value">{band["critical"]}</span></div>
+      </div>
+    </div>""", unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
+    # Distributions + percentiles over the whole upload set
+    section_head("📊 · Survey Distribution")
+    st.markdown("""
+    <div class="chart-panel">
+      <div class="chart-panel-header">
+        <span class="chart-panel-title">📊 &nbsp;Metric Distributions</span>
+        <span class="chart-badge">All images</span>
+      </div>""", unsafe_allow_html=True)
+    show_chart(chart_distribution, summary)
+    st.markdown(percentile_table(summary) + """
+      <div class="chart-panel-footer">
+        <span>Images per 5-point coverage bin, per metric</span>
+        <span>P5–P95 = percentiles across all uploaded images</span>
+      </div>
+    </div>""", unsafe_allow_html=True)
 
-        # Comparison chart — all images side by side
-        section_head("📊 · Side-by-Side Metric Comparison")
-        names  = [r[0][:15] for r in all_results]
-        bleach = [r[1]["bleach"]   for r in all_results]
-        algae  = [r[1]["algae"]    for r in all_results]
-        sedim  = [r[1]["sediment"] for r in all_results]
-        health = [r[1]["health"]   for r in all_results]
-
-        import numpy as np_cmp
-        x = np_cmp.arange(len(names))
-        w = 0.18
-
-        fig_cmp, ax_cmp = plt.subplots(figsize=(max(8, len(names)*2.5), 5))
-        fig_cmp.patch.set_facecolor(CHART_BG)
-        ax_cmp.set_facecolor(CHART_BG)
-
-        b1 = ax_cmp.bar(x - 1.5*w, bleach, w, color=C_BLEACH,  alpha=0.90, label="Bleaching")
-        b2 = ax_cmp.bar(x - 0.5*w, algae,  w, color=C_ALGAE,   alpha=0.90, label="Algae")
-        b3 = ax_cmp.bar(x + 0.5*w, sedim,  w, color=C_SEDIMENT,alpha=0.90, label="Sediment")
-        b4 = ax_cmp.bar(x + 1.5*w, health, w, color=C_HEALTH,  alpha=0.90, label="Health")
-
-        for bars, col in [(b1,C_BLEACH),(b2,C_ALGAE),(b3,C_SEDIMENT),(b4,C_HEALTH)]:
-            for bar in bars:
-                h = bar.get_height()
-                ax_cmp.text(bar.get_x() + bar.get_width()/2, h + 0.8,
-                            f"{h:.1f}%", ha="center", va="bottom",
-                            fontsize=7.5, fontweight="700",
-                            color=col, fontfamily="monospace")
-
-        ax_cmp.set_xticks(x)
-        ax_cmp.set_xticklabels(names, fontsize=10, color="#B0CCDE", fontweight="600")
-        ax_cmp.set_ylim(0, 118)
-        ax_cmp.set_ylabel("Coverage (%)", color="#2D5A78", fontsize=9, labelpad=8)
-        ax_cmp.set_title("All Images — Metric Comparison",
-                         color="#C5DEF8", fontsize=11.5, fontweight="bold",
-                         pad=14, loc="left")
-        ax_cmp.tick_params(axis="x", length=0, labelsize=9)
-        ax_cmp.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
-        ax_cmp.grid(axis="y", color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
-        ax_cmp.legend(frameon=False, fontsize=8.5, labelcolor="#6B93AF",
-                      loc="upper right", ncol=4)
-        for spine in ax_cmp.spines.values():
-            spine.set_visible(False)
-        plt.tight_layout(pad=1.4)
-
-        cmp_buf = io.BytesIO()
-        fig_cmp.savefig(cmp_buf, format="png", dpi=150, bbox_inches="tight",
-                        facecolor=CHART_BG)
-        cmp_buf.seek(0)
-        plt.close(fig_cmp)
+    # Sortable, virtualised table of every result
+    section_head("📋 · All Results")
+    st.dataframe(
+        {"Image": names, "Health": values[:, 3], "Bleaching": values[:, 0],
+         "Algae": values[:, 1], "Sediment": values[:, 2]},
+        hide_index=True, width="stretch", height=min(36 + 35 * len(names), 400),
+        column_config={
+            "Health": st.column_config.ProgressColumn("Health %", format="%.2f", min_value=0, max_value=100),
+            **{c: st.column_config.NumberColumn(f"{c} %", format="%.2f")
+               for c in ("Bleaching", "Algae", "Sediment")},
+        },
+    )
 
-        st.markdown("""
-        <div class="chart-panel">
-          <div class="chart-panel-header">
-                <span class="chart-panel-title">📊 &nbsp;Multi-Image Comparison</span>
-            <div style="display:flex;align-items:center;gap:0.5rem;">
-              <span class="chart-badge">Multi-image</span>
-              <div class="info-wrap">
-                <div class="info-icon">i</div>
-                <div class="info-tooltip">
-                  <strong>📊 Multi-Image Comparison</strong>
-                  Each group of 4 bars = one uploaded image. Compares <b style="color:#90CAF9">Bleaching</b>, <b style="color:#69F0AE">Algae</b>, <b style="color:#FFCC80">Sediment</b>, and <b style="color:#00D4FF">Health</b> scores side by side across all images. Images with a taller cyan (Health) bar and shorter other bars are in better condition.
-                </div>
-              </div>
+    # Paged health cards
+    section_head("🗂 · Health Cards")
+    n_pages = max(1, -(-len(names) // COMPARE_PAGE))
+    if st.session_state.get("cmp_page", 1) > n_pages:
+        st.session_state["cmp_page"] = n_pages
+    c_sort, c_page = st.columns([3, 1])
+    sort = c_sort.selectbox("Order", list(CARD_SORTS), key="cmp_sort", label_visibility="collapsed")
+    page = c_page.number_input(f"Page (of {n_pages})", 1, n_pages, key="cmp_page",
+                               label_visibility="collapsed" if n_pages == 1 else "visible")
+    page_idx = CARD_SORTS[sort](names, values)[(page - 1) * COMPARE_PAGE:page * COMPARE_PAGE]
+    st.markdown(
+        '<div style="display:grid;grid-template-columns:repeat(5,minmax(0,1fr));gap:0.8rem;">'
+        + "".join(health_card(names[i], values[i, 3]) for i in page_idx) + "</div>",
+        unsafe_allow_html=True)
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # Grouped bars for the images on this page
+    st.markdown("""
+    <div class="chart-panel">
+      <div class="chart-panel-header">
+            <span class="chart-panel-title">📊 &nbsp;Multi-Image Comparison</span>
+        <div style="display:flex;align-items:center;gap:0.5rem;">
+          <span class="chart-badge">Multi-image</span>
+          <div class="info-wrap">
+            <div class="info-icon">i</div>
+            <div class="info-tooltip">
+              <strong>📊 Multi-Image Comparison</strong>
+              Each group of 4 bars = one image on the current page. Compares <b style="color:#90CAF9">Bleaching</b>, <b style="color:#69F0AE">Algae</b>, <b style="color:#FFCC80">Sediment</b>, and <b style="color:#00D4FF">Health</b> scores side by side across the page. Images with a taller cyan (Health) bar and shorter other bars are in better condition.
             </div>
-          </div>""", unsafe_allow_html=True)
-        st.image(cmp_buf, use_container_width=True)
-        st.markdown("""
-          <div class="chart-panel-footer">
-            <span>Each group of 4 bars = one uploaded image</span>
-            <span>Blue=Bleaching · Green=Algae · Amber=Sediment · Cyan=Health</span>
           </div>
-        </div>""", unsafe_allow_html=True)
+        </div>
+      </div>""", unsafe_allow_html=True)
+    show_chart(chart_compare, [(names[i], dict(zip(METRICS, values[i]))) for i in page_idx])
+    st.markdown("""
+      <div class="chart-panel-footer">
+        <span>Each group of 4 bars = one image on this page</span>
+        <span>Blue=Bleaching · Green=Algae · Amber=Sediment · Cyan=Health</span>
+      </div>
+    </div>""", unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+
+@st.fragment
+def report_tabs(files, th, site=None):
+    """One tab per upload; only the open tab builds its report, so time to
+    first paint doesn't grow with the number of uploads. Past TAB_LIMIT
+    uploads a tab strip is unusable, so the report is picked from a list."""
+    bind_session_timings()
+    if len(files) > TAB_LIMIT:
+        section_head("🔎 · Image Report")
+        if st.session_state.get("report_pick", 0) >= len(files):
+            st.session_state["report_pick"] = 0
+        i = st.selectbox("Image report", range(len(files)), key="report_pick",
+                         format_func=lambda i: f"{i + 1}. {files[i].name}")
+        with stage("report"):
+            report_progressive(files[i], i, th, site)
+        flush_results()
+        return
+    tab_labels = []
+    for uf in files:
+        label = f"🖼 {uf.name[:18]}"
+        while label in tab_labels:        # tab labels double as the tab's state
+            label += " ·"
+        tab_labels.append(label)
+    tabs = st.tabs(tab_labels, key="report_tab", on_change="rerun")
+
+    for i, (tab, uf) in enumerate(zip(tabs, files)):
+        if not tab.open:
+            continue
+        with tab, stage("report"):
+            report_progressive(uf, i, th, site)
+    flush_results()
 
-    # ── Per-image tabs ────────────────────────────────────────────────────────
-    tab_labels = [f"🖼 {uf.name[:18]}" for uf in uploaded_files]
-    tabs = st.tabs(tab_labels)
 
-    for i, (tab, uf) in enumerate(zip(tabs, uploaded_files)):
-        with tab:
-            pil_image = Image.open(uf)
-            R = analyze_image(pil_image)
-            render_report(uf, pil_image, R, i)
+if uploaded_files:
+    ingest_uploads(uploaded_files, thresholds, site)
+    # The overview sits above the reports but needs every image, so it is
+    # filled last: the open report appears as soon as its own image is ready.
+    overview = st.container()
+    report_tabs(uploaded_files, thresholds, site)
+    if len(uploaded_files) > 1:
+        with overview:
+            comparison_overview(uploaded_files, thresholds, site)
 
 else:
     # ── EMPTY STATE ───────────────────────────────────────────────────────────
@@ -1413,15 +1479,21 @@ else:
       <div class="empty-icon">🌊</div>
       <div class="empty-title">Awaiting Image Upload</div>
       <div class="empty-desc">
-        Use the <strong>sidebar</strong> on the left to upload up to
-        <strong>5 underwater reef photographs</strong> at once.<br><br>
-        Each image gets a full analysis tab. When multiple images are uploaded,
-        a side-by-side comparison overview is shown automatically.
+        Use the <strong>sidebar</strong> on the left to upload one or more
+        <strong>underwater reef photographs</strong>.<br><br>
+        Each image gets a full analysis report. When multiple images are uploaded,
+        a survey overview with distributions and a sortable table is shown automatically.
       </div>
     </div>
     """, unsafe_allow_html=True)
 
 
+if diagnostics:
+    render_diagnostics(diag_panel)
+if METRICS_FILE and timing.enabled():
+    timing.write_textfile(METRICS_FILE)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # ── FOOTER ────────────────────────────────────────────────────────────────────
 # ──────────────────────────────────────────────────────────────────────────────
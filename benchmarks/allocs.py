@@ -0,0 +1,117 @@
+"""
+Steady-state allocations per image on the ingest paths.
+
+Runs each path over a rotating set of synthetic images, warms it up (so
+per-thread scratch buffers reach their final size), then measures with
+tracemalloc, which sees every NumPy buffer. Reports the peak of transient
+allocations per image, the bytes still held after it, and RSS growth over
+the whole run. Fails (exit 1) if the pooled batch path allocates more than
+the budget per image.
+
+    python benchmarks/allocs.py [--images 200] [--size 1920x1080] [--budget 262144]
+
+Paths:
+  batch     decode_reduced(pooled=True) + analyze_array, as batch workers run it
+  app       decode_reduced + resize_for_analysis + colour_hist(8), as the
+            dashboard runs it; its outputs are kept, so they count as allocations
+  video     analyze_bgr on a decoded BGR frame
+"""
+
+import argparse
+import io
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synth import encode, reef_image  # noqa: E402
+from reefscan.engine import (  # noqa: E402
+    analyze_array,
+    analyze_bgr,
+    colour_hist,
+    decode_reduced,
+    resize_for_analysis,
+)
+
+N_DISTINCT = 8     # distinct fixtures, so nothing is served from a warm decoder state
+WARMUP = 3
+
+
+def path_batch(data: bytes, frame: np.ndarray):
+    return analyze_array(decode_reduced(io.BytesIO(data), pooled=True).rgb)
+
+
+def path_app(data: bytes, frame: np.ndarray):
+    dec = decode_reduced(io.BytesIO(data))
+    return dec, colour_hist(resize_for_analysis(dec.rgb), 8)
+
+
+def path_video(data: bytes, frame: np.ndarray):
+    return analyze_bgr(frame)
+
+
+PATHS = {"batch": path_batch, "app": path_app, "video": path_video}
+
+
+def rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def measure(fn, fixtures, n_images: int) -> dict:
+    for i in range(WARMUP * len(fixtures)):
+        fn(*fixtures[i % len(fixtures)])
+    rss0 = rss_mb()
+    peaks, held = [], []
+    tracemalloc.start()
+    try:
+        for i in range(n_images):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            out = fn(*fixtures[i % len(fixtures)])
+            cur, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+            held.append(cur - base)
+            del out
+    finally:
+        tracemalloc.stop()
+    return {"peak_median": int(np.median(peaks)), "peak_max": max(peaks),
+            "held_median": int(np.median(held)), "rss_growth_mb": rss_mb() - rss0}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--images", type=int, default=200)
+    ap.add_argument("--size", default="1920x1080", help="WxH of the synthetic JPEGs")
+    ap.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    ap.add_argument("--budget", type=int, default=256 * 1024,
+                    help="max median transient bytes per image on the batch path")
+    args = ap.parse_args(argv)
+
+    w, h = map(int, args.size.lower().split("x"))
+    fixtures = []
+    for seed in range(N_DISTINCT):
+        rgb = reef_image(w, h, seed)
+        fixtures.append((encode(rgb, "JPEG"), np.ascontiguousarray(rgb[..., ::-1])))
+
+    ok = True
+    print(f"{'path':<8} {'peak/image':>12} {'max':>12} {'held':>10} {'RSS growth':>11}")
+    for name in args.paths:
+        res = measure(PATHS[name], fixtures, args.images)
+        print(f"{name:<8} {res['peak_median']:>10,} B {res['peak_max']:>10,} B "
+              f"{res['held_median']:>8,} B {res['rss_growth_mb']:>8.1f} MB")
+        if name == "batch" and res["peak_median"] > args.budget:
+            print(f"FAIL: batch path allocates {res['peak_median']:,} B per image "
+                  f"(budget {args.budget:,} B)")
+            ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
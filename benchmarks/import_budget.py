@@ -0,0 +1,80 @@
+"""
+Cold-start budget for the headless package.
+
+Imports the reefscan modules that pool workers and the CLI load, each time
+in a fresh interpreter, and fails (exit 1) if the best of N runs exceeds the
+budget or if any UI-side module (Streamlit, matplotlib) was pulled in.
+
+    python benchmarks/import_budget.py [--budget 0.5] [--runs 5]
+
+tests/test_import_budget.py runs the same check under `python -m pytest`.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    "reefscan",
+    "reefscan.batch",
+    "reefscan.charts",
+    "reefscan.ingest",
+    "reefscan.report",
+    "reefscan.rescore",
+    "reefscan.store",
+    "reefscan.tiles",
+    "reefscan.vega",
+    "reefscan.video",
+]
+FORBIDDEN = ["streamlit", "matplotlib"]
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+for m in {modules!r}:
+    __import__(m)
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt,
+                  "forbidden": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(runs: int) -> dict:
+    """Best-of-`runs` import time, and forbidden modules seen in any run."""
+    code = PROBE.format(modules=MODULES, forbidden=FORBIDDEN)
+    times, forbidden = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        res = json.loads(out.stdout)
+        times.append(res["seconds"])
+        forbidden.update(res["forbidden"])
+    return {"best": min(times), "worst": max(times), "forbidden": sorted(forbidden)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--budget", type=float, default=0.5,
+                    help="max seconds for the best run (default 0.5)")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    res = measure(args.runs)
+    print(f"import {len(MODULES)} modules: best {res['best'] * 1000:.0f} ms, "
+          f"worst {res['worst'] * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    ok = True
+    if res["forbidden"]:
+        print(f"FAIL: UI modules imported: {', '.join(res['forbidden'])}")
+        ok = False
+    if res["best"] > args.budget:
+        print("FAIL: over budget")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
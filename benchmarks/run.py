@@ -0,0 +1,270 @@
+"""
+ReefScan · Benchmark Suite
+==========================
+Times the analysis and rendering hot paths on deterministic synthetic reef
+images (benchmarks/synth.py) and writes the results as JSON, so runs from
+different commits can be diffed.
+
+    python benchmarks/run.py                        # everything, VGA..50 MP
+    python benchmarks/run.py --sizes vga hd --only decode classify
+    python benchmarks/run.py -o new.json --compare old.json
+
+Groups:
+  decode    decode_reduced (what the app and batch do) and decode_path (full)
+            for every size x format, and analyze_thumbnail (the app's preview)
+            for JPEGs; the fixtures carry no EXIF thumbnail, so this is the
+            1/8-scale DCT fallback
+  classify  resize_for_analysis, analyze_array (resize + classify),
+            classify_counts at full resolution through the fused comparisons
+            and through the 24-bit lookup table, and estimate_array
+            (±0.5 point sampling estimate of the same), per size
+  charts    every reefscan.charts chart_* function and reefscan.vega spec builder
+            (the distribution chart on a 1000-image survey summary), plus
+            the recovery simulation: unit_bands (the 10,000-scenario ensemble,
+            computed once per process) and recovery_bands (per image, cached)
+  report    full app.py script runs through Streamlit's AppTest with one
+            upload: cold (decode + analysis + render), warm Vega-Lite, warm PNG
+
+Encoded fixtures are cached under <reefscan cache dir>/bench, since PNG and
+WebP encoding of the 50 MP image alone takes about a minute.
+"""
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synth import encode, reef_image  # noqa: E402
+from reefscan import charts, recovery, vega  # noqa: E402
+from reefscan.report import survey_summary  # noqa: E402
+from reefscan.sampling import estimate_array  # noqa: E402
+from reefscan.engine import (  # noqa: E402
+    analyze_array,
+    analyze_thumbnail,
+    cache_dir,
+    classify_counts,
+    decode_path,
+    decode_reduced,
+    resize_for_analysis,
+)
+
+SIZES = {
+    "vga":  (640, 480),
+    "hd":   (1920, 1080),
+    "12mp": (4000, 3000),
+    "50mp": (8192, 6144),
+}
+FORMATS = ["JPEG", "PNG", "WEBP"]
+GROUPS = ["decode", "classify", "charts", "report"]
+SEED = 0
+
+SAMPLE_R = {"bleach": 8.57, "algae": 36.19, "sediment": 10.18, "health": 45.06}
+SAMPLE_COMPARE = [(f"reef{i}.jpg", SAMPLE_R) for i in range(5)]
+SAMPLE_SURVEY = survey_summary(np.random.default_rng(SEED).uniform(0, 100, (1000, 4)))
+
+
+def timeit(fn, min_runs: int = 3, min_time: float = 0.3, max_runs: int = 200) -> dict:
+    """Call fn() at least min_runs times and for at least min_time seconds."""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {
+        "n":         len(times),
+        "min_ms":    min(times) * 1000,
+        "median_ms": statistics.median(times) * 1000,
+        "mean_ms":   statistics.fmean(times) * 1000,
+    }
+
+
+def fixture(size: str, fmt: str) -> bytes:
+    """Encoded synthetic image, cached on disk across runs."""
+    w, h = SIZES[size]
+    path = cache_dir() / "bench" / f"reef_{w}x{h}_s{SEED}.{fmt.lower()}"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(encode(reef_image(w, h, SEED), fmt))
+        tmp.replace(path)
+    return path.read_bytes()
+
+
+def bench_decode(sizes, formats, results):
+    for size in sizes:
+        for fmt in formats:
+            data = fixture(size, fmt)
+            meta = {"size": size, "format": fmt, "bytes": len(data)}
+            results.append({"name": "decode_reduced", **meta,
+                            **timeit(lambda: decode_reduced(io.BytesIO(data)))})
+            results.append({"name": "decode_path", **meta,
+                            **timeit(lambda: decode_path(io.BytesIO(data)))})
+            if fmt == "JPEG":
+                results.append({"name": "analyze_thumbnail", **meta,
+                                **timeit(lambda: analyze_thumbnail(io.BytesIO(data)))})
+
+
+def bench_classify(sizes, results):
+    for size in sizes:
+        w, h = SIZES[size]
+        # pixel-interleaved, as every decoder returns it (reef_image is a planar view)
+        rgb = np.ascontiguousarray(reef_image(w, h, SEED))
+        meta = {"size": size, "pixels": w * h}
+        results.append({"name": "resize_for_analysis", **meta,
+                        **timeit(lambda: resize_for_analysis(rgb))})
+        results.append({"name": "analyze_array", **meta,
+                        **timeit(lambda: analyze_array(rgb))})
+        results.append({"name": "classify_counts", **meta,
+                        **timeit(lambda: classify_counts(rgb, lut=False))})
+        results.append({"name": "classify_counts_lut", **meta,
+                        **timeit(lambda: classify_counts(rgb, lut=True))})
+        results.append({"name": "estimate_array", **meta,
+                        **timeit(lambda: estimate_array(rgb, seed=SEED))})
+
+
+def bench_charts(results):
+    cases = [
+        (charts.chart_bar, vega.bar_spec, SAMPLE_R),
+        (charts.chart_donut, vega.donut_spec, SAMPLE_R),
+        (charts.chart_gauge, vega.gauge_spec, SAMPLE_R),
+        (charts.chart_recovery, vega.recovery_spec, SAMPLE_R),
+        (charts.chart_compare, vega.compare_spec, SAMPLE_COMPARE),
+        (charts.chart_distribution, vega.distribution_spec, SAMPLE_SURVEY),
+    ]
+    def cold_bands():
+        recovery.unit_bands.cache_clear()
+        recovery.recovery_bands(SAMPLE_R["health"])
+
+    def cold_gauge():
+        charts.gauge_png.cache_clear()
+        charts.chart_gauge(SAMPLE_R)
+
+    results.append({"name": "unit_bands", "backend": "numpy", **timeit(cold_bands)})
+    results.append({"name": "gauge_png", "backend": "png", **timeit(cold_gauge)})
+    results.append({"name": "recovery_bands", "backend": "numpy",
+                    **timeit(lambda: recovery.recovery_bands(SAMPLE_R["health"]))})
+    for png_fn, spec_fn, data in cases:
+        t0 = time.perf_counter()
+        png_fn(data)                       # first call: imports, font cache, gauge face
+        first_ms = (time.perf_counter() - t0) * 1000
+        results.append({"name": png_fn.__name__, "backend": "png", "first_ms": first_ms,
+                        **timeit(lambda: png_fn(data))})
+        results.append({"name": png_fn.__name__, "backend": "vega",
+                        "spec_bytes": len(json.dumps(spec_fn(data))),
+                        **timeit(lambda: json.dumps(spec_fn(data)))})
+
+
+def bench_report(results, size: str = "hd"):
+    from streamlit.testing.v1 import AppTest
+
+    data = fixture(size, "JPEG")
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=300).run()
+    at.file_uploader[0].set_value([("reef.jpg", data, "image/jpeg")])
+
+    def run():
+        at.run()
+        if at.exception:
+            raise RuntimeError(at.exception)
+
+    t0 = time.perf_counter()
+    run()
+    results.append({"name": "render_report", "case": "cold", "size": size,
+                    "n": 1, "min_ms": (time.perf_counter() - t0) * 1000})
+    results.append({"name": "render_report", "case": "warm_vega", "size": size,
+                    **timeit(run, min_runs=5)})
+    at.radio(key="chart_backend").set_value("PNG")
+    run()                                  # fill the PNG chart cache
+    results.append({"name": "render_report", "case": "warm_png", "size": size,
+                    **timeit(run, min_runs=5)})
+
+
+def environment() -> dict:
+    import cv2
+    import PIL
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit":   commit,
+        "time":     time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "numpy":    np.__version__,
+        "opencv":   cv2.__version__,
+        "pillow":   PIL.__version__,
+    }
+
+
+def _key(row: dict) -> tuple:
+    return tuple((k, row[k]) for k in ("name", "size", "format", "backend", "case") if k in row)
+
+
+def compare(base_path, rows: list, threshold: float = 0.10):
+    """Print median-time ratios against an earlier results file."""
+    base = {_key(r): r for r in json.loads(Path(base_path).read_text())["results"]}
+    print(f"\n{'benchmark':<58} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for row in rows:
+        old = base.get(_key(row))
+        if old is None:
+            continue
+        o, n = old.get("median_ms", old["min_ms"]), row.get("median_ms", row["min_ms"])
+        ratio = n / o if o else float("inf")
+        flag = " slower" if ratio > 1 + threshold else (" faster" if ratio < 1 - threshold else "")
+        label = " ".join(str(v) for _, v in _key(row))
+        print(f"{label:<58} {o:>10.2f} {n:>10.2f} {ratio:>6.2f}x{flag}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark ReefScan's analysis and rendering paths.")
+    ap.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    ap.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    ap.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS)
+    ap.add_argument("-o", "--output", help="results JSON (default bench-<commit>.json)")
+    ap.add_argument("--compare", metavar="BASE_JSON", help="print ratios against an earlier run")
+    args = ap.parse_args(argv)
+
+    env = environment()
+    results = []
+    for group in args.only:
+        t0 = time.perf_counter()
+        n0 = len(results)
+        if group == "decode":
+            bench_decode(args.sizes, args.formats, results)
+        elif group == "classify":
+            bench_classify(args.sizes, results)
+        elif group == "charts":
+            bench_charts(results)
+        elif group == "report":
+            bench_report(results)
+        print(f"{group}: {len(results) - n0} benchmarks in {time.perf_counter() - t0:.1f}s",
+              file=sys.stderr)
+
+    for row in results:
+        label = " ".join(str(v) for _, v in _key(row))
+        print(f"{label:<58} {row.get('median_ms', row['min_ms']):>10.2f} ms")
+
+    out = Path(args.output or f"bench-{(env['commit'] or 'nogit')[:8]}.json")
+    out.write_text(json.dumps({"environment": env, "results": results}, indent=1))
+    print(f"wrote {out}", file=sys.stderr)
+
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Deterministic synthetic reef images for benchmarks.
+
+The same (width, height, seed) always gives the same pixels, so timings
+and detection results are comparable between commits. Images are built
+from a blue water gradient with smooth low-frequency blobs painted as
+bleached coral, algae and sediment, plus fine grain so JPEG/WebP don't
+compress them unrealistically well.
+"""
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# (colour, share of the frame) for each painted class, roughly a stressed reef
+PAINT = [
+    ((232, 236, 240), 0.12),   # bleached coral: R, G, B all bright
+    (( 70, 150,  60), 0.25),   # algae: green-dominant
+    ((150,  95,  50), 0.10),   # sediment: warm brown, low blue
+]
+
+
+def _field(rng, width: int, height: int, cells: int = 12) -> np.ndarray:
+    """Smooth noise in [0, 1): a coarse random grid upsampled with bicubic."""
+    gh = max(2, cells * height // max(width, height))
+    gw = max(2, cells * width // max(width, height))
+    coarse = rng.random((gh, gw), dtype=np.float32)
+    return cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def reef_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """uint8 RGB reef-like image of the given size."""
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    deep, shallow = np.array([10, 45, 90], np.float32), np.array([30, 120, 170], np.float32)
+    img = np.broadcast_to(shallow + (deep - shallow) * y, (height, width, 3)).astype(np.float32)
+
+    for colour, share in PAINT:
+        f = _field(rng, width, height)
+        mask = f > np.quantile(f[::16, ::16], 1 - share)
+        img[mask] = colour
+
+    grain = rng.integers(-12, 13, (height, width, 1), dtype=np.int16)
+    return np.clip(img + grain, 0, 255).astype(np.uint8)
+
+
+def encode(rgb: np.ndarray, fmt: str, quality: int = 90) -> bytes:
+    """Encode an RGB array as JPEG, PNG or WEBP bytes."""
+    buf = io.BytesIO()
+    opts = {"quality": quality} if fmt in ("JPEG", "WEBP") else {"compress_level": 6}
+    Image.fromarray(rgb).save(buf, fmt, **opts)
+    return buf.getvalue()
@@ -0,0 +1,45 @@
+"""
+ReefScan · headless analysis package.
+
+The Streamlit dashboard lives in app.py; everything here runs without it.
+"""
+
+from reefscan.engine import (
+    DEFAULT_THRESHOLDS,
+    RESIZE_TO,
+    ColourHist,
+    Decoded,
+    Thresholds,
+    analyze_array,
+    analyze_image,
+    analyze_thumbnail,
+    classify_counts,
+    colour_hist,
+    decode_path,
+    decode_reduced,
+    label_map,
+    score_hist,
+    thresholds_from_fractions,
+)
+from reefscan.sampling import estimate_array
+from reefscan.tiles import analyze_tiled
+
+__all__ = [
+    "DEFAULT_THRESHOLDS",
+    "RESIZE_TO",
+    "ColourHist",
+    "Decoded",
+    "Thresholds",
+    "analyze_array",
+    "analyze_image",
+    "analyze_thumbnail",
+    "analyze_tiled",
+    "classify_counts",
+    "colour_hist",
+    "decode_path",
+    "decode_reduced",
+    "estimate_array",
+    "label_map",
+    "score_hist",
+    "thresholds_from_fractions",
+]
@@ -0,0 +1,23 @@
+"""Command-line entry point: python -m reefscan <command> ..."""
+
+import argparse
+import sys
+
+from reefscan import batch, rescore, store, tiles, video
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m reefscan",
+                                     description="ReefScan headless analysis tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    batch.add_parser(sub)
+    rescore.add_parser(sub)
+    store.add_parser(sub)
+    tiles.add_parser(sub)
+    video.add_parser(sub)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
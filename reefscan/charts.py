@@ -0,0 +1,425 @@
+"""
+ReefScan · Matplotlib Charts
+============================
+PNG renderings of the dashboard charts. matplotlib is imported on first
+use rather than with the module, so workers and CLI runs that never draw a
+chart don't pay for it; reefscan.vega builds the browser-rendered
+equivalents.
+"""
+
+import functools
+import io
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from reefscan.recovery import SCENARIOS, months, recovery_bands
+from reefscan.theme import CHART_BG, C_ALGAE, C_BLEACH, C_HEALTH, C_SEDIMENT
+from reefscan.timing import stage
+
+CHART_DPI   = 160
+COMPARE_DPI = 150
+
+
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """matplotlib.pyplot on the non-interactive Agg backend, imported on first call."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _savefig(fig, dpi: int = CHART_DPI) -> io.BytesIO:
+    buf = io.BytesIO()
+    with stage("savefig"):
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight",
+                    facecolor=CHART_BG, edgecolor="none")
+    buf.seek(0)
+    _pyplot().close(fig)
+    return buf
+
+
+def chart_bar(R: dict) -> io.BytesIO:
+    """Vertical bar chart -- pollution & health breakdown."""
+    labels = ["Coral\nBleaching", "Algae\nBloom", "Sediment", "Marine\nHealth"]
+    values = [R["bleach"], R["algae"], R["sediment"], R["health"]]
+    colors = [C_BLEACH, C_ALGAE, C_SEDIMENT, C_HEALTH]
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(9, 5.2))
+    fig.patch.set_facecolor(CHART_BG)
+    ax.set_facecolor(CHART_BG)
+
+    x = np.arange(len(labels))
+    width = 0.52
+
+    # grey 100% background track
+    ax.bar(x, [100] * 4, width=width, color="#FFFFFF", alpha=0.04, zorder=1)
+
+    # coloured value bars
+    bars = ax.bar(x, values, width=width, color=colors, alpha=0.90, zorder=3)
+
+    for bar, val, col in zip(bars, values, colors):
+        # top-edge accent line
+        ax.plot(
+            [bar.get_x() + 0.04, bar.get_x() + bar.get_width() - 0.04],
+            [val, val],
+            color=col, linewidth=3, solid_capstyle="round", zorder=5, alpha=0.85,
+        )
+        # value label above bar
+        ax.text(
+            bar.get_x() + bar.get_width() / 2,
+            val + 1.5,
+            f"{val:.2f}%",
+            ha="center", va="bottom",
+            fontsize=10, fontweight="700",
+            color=col, fontfamily="monospace",
+        )
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, fontsize=10.5, color="#B0CCDE", fontweight="600")
+    ax.set_ylim(0, 118)
+    ax.set_ylabel("Coverage  (%)", color="#2D5A78", fontsize=9, labelpad=10)
+    ax.set_title("Pollution & Health Coverage Analysis",
+                 color="#C5DEF8", fontsize=11.5, fontweight="bold",
+                 pad=16, loc="left")
+    ax.tick_params(axis="x", colors="#2D5A78", labelsize=9, length=0)
+    ax.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
+    ax.grid(axis="y", color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
+
+    # Marine Health Score annotation box
+    score = R["health"]
+    ax.text(
+        0.985, 0.97,
+        f"Marine Health Score\n{score:.2f}%",
+        transform=ax.transAxes, ha="right", va="top",
+        fontsize=9, color="#00D4FF", fontfamily="monospace",
+        bbox=dict(facecolor=(0.024, 0.118, 0.188, 0.85),
+                  edgecolor=(0.0, 0.83, 1.0, 0.4),
+                  boxstyle="round,pad=0.5", linewidth=1),
+    )
+
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    plt.tight_layout(pad=1.6)
+    return _savefig(fig)
+
+
+def chart_donut(R: dict) -> io.BytesIO:
+    """Donut chart — ecosystem composition breakdown."""
+    labels = ["Bleaching", "Algae", "Sediment", "Healthy Water"]
+    values = [R["bleach"], R["algae"], R["sediment"], R["health"]]
+    colors = [C_BLEACH, C_ALGAE, C_SEDIMENT, C_HEALTH]
+    safe   = [max(v, 0.01) for v in values]
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(5.4, 5.4))
+    fig.patch.set_facecolor(CHART_BG)
+    ax.set_facecolor(CHART_BG)
+
+    wedges, _, autotexts = ax.pie(
+        safe, colors=colors, startangle=90,
+        autopct="%1.1f%%", pctdistance=0.76,
+        wedgeprops=dict(width=0.52, edgecolor=CHART_BG, linewidth=2.5),
+    )
+    for at in autotexts:
+        at.set_color("#D6EAF8"); at.set_fontsize(8); at.set_fontweight("600")
+
+    # centre text
+    ax.text(0,  0.13, f"{R['health']:.1f}%",
+            ha="center", va="center", fontsize=21, fontweight="800",
+            color="#00D4FF", fontfamily="monospace")
+    ax.text(0, -0.10, "HEALTH INDEX",
+            ha="center", va="center", fontsize=6.5,
+            color="#2D5A78", fontfamily="monospace", fontstyle="normal")
+
+    from matplotlib.patches import Patch
+
+    patches = [Patch(color=c, label=l)
+               for c, l in zip(colors, labels)]
+    ax.legend(handles=patches, loc="lower center",
+              bbox_to_anchor=(0.5, -0.06), ncol=4, frameon=False,
+              fontsize=7.5, labelcolor="#4A7A96")
+    ax.set_title("Ecosystem Composition", color="#C5DEF8",
+                 fontsize=10.5, fontweight="bold", pad=10)
+    plt.tight_layout(pad=1.2)
+    return _savefig(fig)
+
+
+# Health gauge: the static face is rendered once; needle and score are composited per
+# score shown, and the encoded PNG is kept for the next result with that score.
+GAUGE_PNG_CACHE = 256   # encoded gauges kept, about 40 KB each
+GAUGE_NEEDLE_LEN = 0.80
+
+
+@functools.lru_cache(maxsize=None)
+def gauge_face() -> dict:
+    """Gauge artwork without needle or score (BGR), and its data-to-pixel mapping."""
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(5.8, 3.8))
+    fig.patch.set_facecolor(CHART_BG)
+    ax.set_facecolor(CHART_BG)
+    ax.set_aspect("equal"); ax.axis("off")
+
+    R_OUT, R_IN = 1.0, 0.60
+    zones = [
+        (180, 135, "#C0392B", "Critical"),
+        (135,  90, "#E67E22", "Poor"),
+        ( 90,  45, "#F4D03F", "Fair"),
+        ( 45,   0, "#27AE60", "Good"),
+    ]
+
+    for a0, a1, col, lbl in zones:
+        th = np.linspace(np.radians(a0), np.radians(a1), 120)
+        xo, yo = R_OUT * np.cos(th), R_OUT * np.sin(th)
+        xi, yi = R_IN  * np.cos(th), R_IN  * np.sin(th)
+        ax.fill(np.concatenate([xo, xi[::-1]]),
+                np.concatenate([yo, yi[::-1]]),
+                color=col, alpha=0.88, zorder=2, linewidth=0)
+        mid = np.radians((a0 + a1) / 2)
+        rm  = (R_IN + R_OUT) / 2
+        ax.text(rm * np.cos(mid), rm * np.sin(mid), lbl,
+                ha="center", va="center", fontsize=6.2,
+                color="white", fontweight="bold",
+                rotation=(a0 + a1) / 2 - 90, zorder=5)
+
+    # divider gaps
+    for deg in [135, 90, 45]:
+        rd = np.radians(deg)
+        ax.plot([R_IN * np.cos(rd), R_OUT * np.cos(rd)],
+                [R_IN * np.sin(rd), R_OUT * np.sin(rd)],
+                color=CHART_BG, linewidth=3.5, zorder=4)
+
+    # inner fill
+    th2 = np.linspace(0, np.pi, 200)
+    ax.fill(np.concatenate([R_IN * np.cos(th2), [0]]),
+            np.concatenate([R_IN * np.sin(th2), [0]]),
+            color="#0D1525", zorder=3)
+
+    # tick labels
+    for deg, lbl in [(180, "0"), (135, "25"), (90, "50"), (45, "75"), (0, "100")]:
+        rd = np.radians(deg)
+        tx = (R_OUT + 0.15) * np.cos(rd)
+        ty = (R_OUT + 0.15) * np.sin(rd)
+        ha = "right" if deg > 91 else ("left" if deg < 89 else "center")
+        ax.text(tx, ty, lbl, ha=ha, va="center",
+                fontsize=6.5, color="#2D5A78", fontfamily="monospace")
+
+    ax.text(0, 0.12, "Marine Health Score",
+            ha="center", va="center",
+            fontsize=6.2, color="#2D5A78",
+            fontfamily="monospace", zorder=11)
+
+    ax.set_xlim(-1.40, 1.40)
+    ax.set_ylim(-0.20, 1.32)
+    ax.set_title("Health Gauge", color="#C5DEF8",
+                 fontsize=10.5, fontweight="bold", pad=8)
+    plt.tight_layout(pad=0.5)
+
+    # Rasterise once at chart DPI, cropped like savefig(bbox_inches="tight").
+    fig.set_dpi(CHART_DPI)
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    h = rgba.shape[0]
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+    x0, x1 = max(0, int(bbox.x0 * CHART_DPI)), int(np.ceil(bbox.x1 * CHART_DPI))
+    y0, y1 = max(0, h - int(np.ceil(bbox.y1 * CHART_DPI))), h - int(bbox.y0 * CHART_DPI)
+    (cx, cy), (ux, _) = ax.transData.transform([(0, 0), (1, 0)])
+    plt.close(fig)
+
+    pt = CHART_DPI / 72   # points -> pixels
+    from matplotlib import font_manager
+
+    font_path = font_manager.findfont(font_manager.FontProperties(family="monospace", weight="bold"))
+    return {
+        "bgr":    cv2.cvtColor(np.ascontiguousarray(rgba[y0:y1, x0:x1, :3]), cv2.COLOR_RGB2BGR),
+        "centre": (cx - x0, h - cy - y0),
+        "unit":   ux - cx,                  # pixels per data unit (equal aspect)
+        "pt":     pt,
+        "font":   ImageFont.truetype(font_path, round(18 * pt)),
+    }
+
+
+def _blit_text(img: np.ndarray, text: str, centre: tuple, font, bgr: tuple):
+    """Alpha-blend anti-aliased text centred at `centre` into a BGR image, in place."""
+    x0, y0, x1, y1 = font.getbbox(text, anchor="mm")
+    mask = Image.new("L", (x1 - x0, y1 - y0))
+    ImageDraw.Draw(mask).text((-x0, -y0), text, font=font, fill=255, anchor="mm")
+    alpha = np.asarray(mask, dtype=np.float32)[..., None] / 255
+    px, py = round(centre[0]) + x0, round(centre[1]) + y0
+    region = img[py:py + alpha.shape[0], px:px + alpha.shape[1]]
+    region[:] = region + (np.array(bgr, np.float32) - region) * alpha
+
+
+def _hex_bgr(colour: str) -> tuple:
+    return tuple(int(colour[i:i + 2], 16) for i in (5, 3, 1))
+
+
+def chart_gauge(R: dict) -> io.BytesIO:
+    """Semi-circular health gauge — Critical / Poor / Fair / Good."""
+    # The readout shows one decimal, and 0.1 points turns the needle by 0.18°.
+    return io.BytesIO(gauge_png(round(float(R["health"]), 1)))
+
+
+@functools.lru_cache(maxsize=GAUGE_PNG_CACHE)
+def gauge_png(score: float) -> bytes:
+    """Encoded gauge for one score; PNG encoding is most of the cost, so keep the bytes."""
+    face = gauge_face()
+    img = face["bgr"].copy()
+    (cx, cy), unit, pt = face["centre"], face["unit"], face["pt"]
+    SUB = 16   # cv2 fixed-point (shift=4) for sub-pixel positions
+
+    # needle
+    nd = np.radians(180 - (score / 100) * 180)
+    tip = (cx + GAUGE_NEEDLE_LEN * unit * np.cos(nd), cy - GAUGE_NEEDLE_LEN * unit * np.sin(nd))
+    fx = lambda p: (round(p[0] * SUB), round(p[1] * SUB))   # noqa: E731
+    cv2.line(img, fx((cx, cy)), fx(tip), (255, 255, 255), round(2.8 * pt), cv2.LINE_AA, 4)
+    cv2.circle(img, fx(tip), round(5.5 * pt / 2 * SUB), _hex_bgr("#00D4FF"), -1, cv2.LINE_AA, 4)
+    cv2.circle(img, fx((cx, cy)), round(13 * pt / 2 * SUB), _hex_bgr("#00D4FF"), -1, cv2.LINE_AA, 4)
+    cv2.circle(img, fx((cx, cy)), round(8 * pt / 2 * SUB), _hex_bgr("#0D1525"), -1, cv2.LINE_AA, 4)
+
+    # score readout
+    _blit_text(img, f"{score:.1f}%", (cx, cy - 0.31 * unit), face["font"], _hex_bgr("#00D4FF"))
+
+    with stage("png_encode"):
+        ok, png = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    return png.tobytes()
+
+
+def chart_recovery(R: dict) -> io.BytesIO:
+    """Marine Recovery Simulation — median logistic curves with Monte-Carlo bands."""
+    t = months()
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 5.2))
+    fig.patch.set_facecolor(CHART_BG)
+    ax.set_facecolor(CHART_BG)
+
+    # band rows are the 10th, 25th, 50th, 75th and 90th percentiles
+    legend_lines, legend_labels = [], []
+    for name, yb, yi, cb, ci in recovery_bands(R["health"]):
+        for q, col in ((yb, cb), (yi, ci)):
+            ax.fill_between(t, q[0], q[4], color=col, alpha=0.08, lw=0)
+            ax.fill_between(t, q[1], q[3], color=col, alpha=0.16, lw=0)
+        lb, = ax.plot(t, yb[2], "--", lw=1.8, color=cb, alpha=0.75)
+        li, = ax.plot(t, yi[2], "-",  lw=2.5, color=ci)
+        legend_lines  += [lb, li]
+        legend_labels += [f"{name} — Baseline", f"{name} — Improved"]
+
+    ax.axhline(1.0, color="#FFFFFF", alpha=0.06, lw=1, ls=":")
+    ax.text(49, 1.013, "Full Recovery",
+            color="#2D5A78", fontsize=7.5, ha="right", fontfamily="monospace")
+
+    ax.text(
+        0.015, 0.97,
+        f"  Health Boost  +{R['health']:.0f}%  ",
+        transform=ax.transAxes, ha="left", va="top",
+        fontsize=8.5, color="#00D4FF", fontfamily="monospace",
+        bbox=dict(facecolor=(0.024, 0.118, 0.188, 0.85),
+                  edgecolor=(0.0, 0.83, 1.0, 0.4),
+                  boxstyle="round,pad=0.45", linewidth=1),
+    )
+
+    ax.legend(legend_lines, legend_labels,
+              loc="lower right", ncol=1, frameon=True,
+              framealpha=0.10, edgecolor=(1.0, 1.0, 1.0, 0.07),
+              facecolor="#080E17", fontsize=8, labelcolor="#4A7A96")
+
+    ax.set_xlim(0, 50); ax.set_ylim(0, 1.10)
+    ax.set_xlabel("Time (Months)",  color="#2D5A78", fontsize=9.5, labelpad=8)
+    ax.set_ylabel("Recovery Level", color="#2D5A78", fontsize=9.5, labelpad=8)
+    ax.set_title(f"Marine Recovery Simulation  ·  Boost: {R['health']:.0f}%  ·  {SCENARIOS:,} scenarios",
+                 color="#C5DEF8", fontsize=11.5, fontweight="bold", pad=16, loc="left")
+    ax.tick_params(axis="x", colors="#2D5A78", labelsize=8.5)
+    ax.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
+    ax.grid(color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
+
+    for spine in ["top", "right"]:
+        ax.spines[spine].set_visible(False)
+    for spine in ["left", "bottom"]:
+        ax.spines[spine].set_edgecolor((1.0, 1.0, 1.0, 0.07))
+        ax.spines[spine].set_linewidth(0.8)
+
+    plt.tight_layout(pad=1.6)
+    return _savefig(fig)
+
+
+def chart_compare(results: list) -> io.BytesIO:
+    """Grouped bar chart -- every metric for every uploaded image side by side."""
+    names  = [r[0][:15] for r in results]
+    bleach = [r[1]["bleach"]   for r in results]
+    algae  = [r[1]["algae"]    for r in results]
+    sedim  = [r[1]["sediment"] for r in results]
+    health = [r[1]["health"]   for r in results]
+
+    x = np.arange(len(names))
+    w = 0.18
+
+    plt = _pyplot()
+    fig_cmp, ax_cmp = plt.subplots(figsize=(max(8, len(names)*2.5), 5))
+    fig_cmp.patch.set_facecolor(CHART_BG)
+    ax_cmp.set_facecolor(CHART_BG)
+
+    b1 = ax_cmp.bar(x - 1.5*w, bleach, w, color=C_BLEACH,  alpha=0.90, label="Bleaching")
+    b2 = ax_cmp.bar(x - 0.5*w, algae,  w, color=C_ALGAE,   alpha=0.90, label="Algae")
+    b3 = ax_cmp.bar(x + 0.5*w, sedim,  w, color=C_SEDIMENT,alpha=0.90, label="Sediment")
+    b4 = ax_cmp.bar(x + 1.5*w, health, w, color=C_HEALTH,  alpha=0.90, label="Health")
+
+    for bars, col in [(b1,C_BLEACH),(b2,C_ALGAE),(b3,C_SEDIMENT),(b4,C_HEALTH)]:
+        for bar in bars:
+            h = bar.get_height()
+            ax_cmp.text(bar.get_x() + bar.get_width()/2, h + 0.8,
+                        f"{h:.1f}%", ha="center", va="bottom",
+                        fontsize=7.5, fontweight="700",
+                        color=col, fontfamily="monospace")
+
+    ax_cmp.set_xticks(x)
+    ax_cmp.set_xticklabels(names, fontsize=10, color="#B0CCDE", fontweight="600")
+    ax_cmp.set_ylim(0, 118)
+    ax_cmp.set_ylabel("Coverage (%)", color="#2D5A78", fontsize=9, labelpad=8)
+    ax_cmp.set_title("All Images — Metric Comparison",
+                     color="#C5DEF8", fontsize=11.5, fontweight="bold",
+                     pad=14, loc="left")
+    ax_cmp.tick_params(axis="x", length=0, labelsize=9)
+    ax_cmp.tick_params(axis="y", colors="#2D5A78", labelsize=8.5)
+    ax_cmp.grid(axis="y", color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
+    ax_cmp.legend(frameon=False, fontsize=8.5, labelcolor="#6B93AF",
+                  loc="upper right", ncol=4)
+    for spine in ax_cmp.spines.values():
+        spine.set_visible(False)
+    plt.tight_layout(pad=1.4)
+
+    return _savefig(fig_cmp, dpi=COMPARE_DPI)
+
+
+def chart_distribution(summary: dict) -> io.BytesIO:
+    """Per-metric histograms of a survey (report.survey_summary), one panel each."""
+    edges = np.asarray(summary["edges"])
+    panels = [("bleach", "Bleaching", C_BLEACH), ("algae", "Algae", C_ALGAE),
+              ("sediment", "Sediment", C_SEDIMENT), ("health", "Health", C_HEALTH)]
+
+    plt = _pyplot()
+    fig, axes = plt.subplots(1, 4, figsize=(12, 3.4))
+    fig.patch.set_facecolor(CHART_BG)
+    for ax, (key, label, col) in zip(axes, panels):
+        ax.set_facecolor(CHART_BG)
+        ax.bar(edges[:-1], summary["hist"][key], width=np.diff(edges) * 0.9,
+               align="edge", color=col, alpha=0.90)
+        ax.set_xlim(0, 100)
+        ax.set_title(label, color="#B0CCDE", fontsize=10, fontweight="600")
+        ax.set_xlabel("Coverage (%)", color="#2D5A78", fontsize=8.5)
+        ax.tick_params(colors="#2D5A78", labelsize=8)
+        ax.grid(axis="y", color="#FFFFFF", alpha=0.04, linestyle="--", linewidth=0.8)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+    axes[0].set_ylabel("Images", color="#2D5A78", fontsize=9)
+    fig.suptitle(f"Survey Distribution — {summary['n']} images", color="#C5DEF8",
+                 fontsize=11.5, fontweight="bold", x=0.01, ha="left")
+    # fixed margins: tight_layout on four axes costs more than the drawing
+    fig.subplots_adjust(left=0.05, right=0.99, bottom=0.17, top=0.80, wspace=0.22)
+    return _savefig(fig, dpi=COMPARE_DPI)
+
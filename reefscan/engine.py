@@ -0,0 +1,506 @@
+"""
+ReefScan · Analysis Engine
+==========================
+Pixel classification for coral reef images. Pure NumPy/OpenCV/Pillow, with
+no Streamlit or matplotlib imports, so it can be used from the dashboard,
+the batch CLI and pool workers alike.
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from reefscan.timing import stage
+
+
+class Thresholds(NamedTuple):
+    """Integer (0–255) cut-offs, equivalent to the notebook's 0–1 float rules."""
+    bleach:     int = 204   # R, G, B  > 204   (> 0.80)
+    algae:      int = 115   # G       >= 115   (> 0.45), and G > R
+    sediment_r: int = 102   # R        > 102   (> 0.40)
+    sediment_b: int = 77    # B        <  77   (< 0.30)
+
+
+DEFAULT_THRESHOLDS = Thresholds()
+METRICS = ("bleach", "algae", "sediment", "health")   # the percentages in every result dict
+RESIZE_TO = (500, 500)
+THUMB_SIZE = (64, 64)   # analyze_thumbnail: a first, rough answer
+_LEVELS = np.arange(256) / 255.0   # the notebook's float view of each channel value
+
+
+def thresholds_from_fractions(bleach: float = 0.80, algae: float = 0.45,
+                              sediment_r: float = 0.40, sediment_b: float = 0.30) -> Thresholds:
+    """Integer cut-offs that reproduce the float rules `x / 255.0 > t` (`< t` for sediment B)."""
+    n_at_most = lambda t: int(np.count_nonzero(_LEVELS <= t))   # noqa: E731
+    return Thresholds(
+        bleach=n_at_most(bleach) - 1,          # v > t*255  <=>  v > last v with v/255 <= t
+        algae=n_at_most(algae),                # v >= first v with v/255 > t
+        sediment_r=n_at_most(sediment_r) - 1,
+        sediment_b=int(np.count_nonzero(_LEVELS < sediment_b)),   # v < first v with v/255 >= t
+    )
+
+
+# One bit per rule in the fused class-code plane (codes 0–7)
+BIT_BLEACH, BIT_ALGAE, BIT_SEDIMENT = 1, 2, 4
+
+# Single-class labels for the per-pixel map. The rules overlap (a pixel can be
+# both algae and sediment, or bleached and green-dominant), so each code is
+# resolved by priority: bleaching > algae > sediment.
+LABEL_HEALTHY, LABEL_BLEACH, LABEL_ALGAE, LABEL_SEDIMENT = 0, 1, 2, 3
+CODE_TO_LABEL = np.array([LABEL_HEALTHY, LABEL_BLEACH, LABEL_ALGAE, LABEL_BLEACH,
+                          LABEL_SEDIMENT, LABEL_BLEACH, LABEL_ALGAE, LABEL_BLEACH], dtype=np.uint8)
+
+
+# ── Per-thread scratch buffers ────────────────────────────────────────────────
+# Temporaries of the per-image path (resize target, rule masks, colour
+# indices) are carved out of byte buffers kept per thread, so a worker that
+# analyses image after image stops allocating once its buffers have grown to
+# the largest size seen. Requests above SCRATCH_MAX_BYTES get plain arrays,
+# so one huge image can't pin its memory for the life of the thread.
+SCRATCH_MAX_BYTES = 16 * 1024 * 1024
+
+_scratch = threading.local()
+
+
+def scratch(name: str, shape, dtype=np.uint8) -> np.ndarray:
+    """Uninitialised array backed by this thread's `name` buffer.
+
+    Valid until the same thread asks for `name` again: never return one to a
+    caller, or keep it, past the function that requested it.
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    if nbytes > SCRATCH_MAX_BYTES:
+        return np.empty(shape, dtype)
+    pool = _scratch.__dict__
+    buf = pool.get(name)
+    if buf is None or buf.size < nbytes:
+        buf = pool[name] = np.empty(nbytes, np.uint8)
+    return buf[:nbytes].view(dtype).reshape(shape)
+
+
+def class_codes(rgb: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS,
+                out: np.ndarray = None) -> np.ndarray:
+    """Fused uint8 code plane: bit 0 = bleach, bit 1 = algae, bit 2 = sediment.
+
+    Written into `out` if given; the rule masks live in scratch buffers.
+    """
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    code = np.empty(r.shape, np.uint8) if out is None else out
+    m1 = scratch("codes.m1", r.shape, np.bool_)
+    m2 = scratch("codes.m2", r.shape, np.bool_)
+
+    # Bleaching = very bright (white) pixels
+    np.minimum(r, g, out=code)
+    np.minimum(code, b, out=code)
+    np.greater(code, th.bleach, out=code.view(np.bool_))
+    # Algae bloom = dominant green
+    np.greater_equal(g, th.algae, out=m1)
+    m1 &= np.greater(g, r, out=m2)
+    code |= np.left_shift(m1.view(np.uint8), 1, out=m1.view(np.uint8))
+    # Sediment = brownish (red dominant, low blue)
+    np.greater(r, th.sediment_r, out=m1)
+    m1 &= np.less(b, th.sediment_b, out=m2)
+    code |= np.left_shift(m1.view(np.uint8), 2, out=m1.view(np.uint8))
+    return code
+
+
+def counts_from_hist(hist: np.ndarray) -> tuple:
+    """Collapse an 8-bin class-code histogram into (bleach, algae, sediment) counts."""
+    return (hist[[1, 3, 5, 7]].sum(),
+            hist[[2, 3, 6, 7]].sum(),
+            hist[[4, 5, 6, 7]].sum())
+
+
+# ── 24-bit colour lookup table ────────────────────────────────────────────────
+# The rules depend only on a pixel's (R, G, B), so the class code of every
+# colour fits in a 16.7M-entry uint8 table indexed by R | G << 8 | B << 16.
+# Built once per threshold set, saved next to other ReefScan caches and
+# memory-mapped afterwards. Used by default for pixel-interleaved arrays of
+# LUT_MIN_PIXELS or more, where loading the table is amortised and one gather
+# replaces the per-rule comparisons (about 2.5x faster on decoded 12 MP
+# images; see the classify group in benchmarks/run.py). REEFSCAN_LUT=0 turns
+# it off.
+LUT_MIN_PIXELS = 4_000_000
+LUT_ENABLED = os.environ.get("REEFSCAN_LUT", "1") != "0" and sys.byteorder == "little"
+LUT_CHUNK = 1 << 16    # pixels per gather: 512 KB of intp indices, 192 KB of pixels
+
+_luts = {}
+_lut_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get("REEFSCAN_CACHE_DIR", Path.home() / ".cache" / "reefscan"))
+
+
+def build_lut(th: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """Class code of every 24-bit colour, one blue plane (65 536 colours) at a time."""
+    v = np.arange(256, dtype=np.uint8)
+    g, r = np.meshgrid(v, v, indexing="ij")
+    plane = np.empty((256, 256, 3), dtype=np.uint8)
+    plane[..., 0], plane[..., 1] = r, g
+    lut = np.empty(1 << 24, dtype=np.uint8)
+    for b in range(256):
+        plane[..., 2] = b
+        lut[b << 16:(b + 1) << 16] = class_codes(plane, th).ravel()
+    return lut
+
+
+def get_lut(th: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """The LUT for `th`: memory-mapped from disk if saved, otherwise built and saved."""
+    lut = _luts.get(th)
+    if lut is not None:
+        return lut
+    with _lut_lock:
+        if th in _luts:
+            return _luts[th]
+        path = cache_dir() / f"lut-{th.bleach}-{th.algae}-{th.sediment_r}-{th.sediment_b}.npy"
+        try:
+            lut = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            lut = build_lut(th)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp, "wb") as fh:
+                    np.save(fh, lut)
+                os.replace(tmp, path)
+            except OSError:
+                pass   # read-only home: keep the in-memory table for this process
+        _luts[th] = lut
+        return lut
+
+
+def lut_codes(rgb: np.ndarray, lut: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """(H, W) uint8 class codes via one gather per pixel, written into `out` if given.
+
+    Works through blocks of about LUT_CHUNK pixels: each block of rows is
+    copied into a scratch buffer one byte longer than the pixels, so an
+    unaligned little-endian uint32 read at every pixel start gives
+    R | G << 8 | B << 16 | <next byte> << 24 for every pixel, the last
+    included, and any (H, W, 3) view (tiles, memory maps) is accepted. The
+    words are masked and widened to intp in scratch too, so np.take neither
+    converts nor allocates and everything it touches but the table stays in L2.
+    """
+    height, width = rgb.shape[:2]
+    codes = np.empty((height, width), np.uint8) if out is None else out.reshape(height, width)
+    rows = max(1, LUT_CHUNK // max(width, 1))
+    pad = scratch("lut.rgb", (rows * width * 3 + 1,))
+    idx = scratch("lut.idx", (rows * width,), np.intp)
+    for y in range(0, height, rows):
+        block = rgb[y:y + rows]
+        m = block.shape[0] * width
+        pad[:3 * m].reshape(block.shape)[...] = block
+        words = np.ndarray((m,), dtype="<u4", buffer=pad, strides=(3,))
+        i = idx[:m]
+        np.copyto(i, words)
+        i &= 0xFFFFFF
+        # indices are < 2**24 by construction; "clip" skips np.take's buffered output
+        np.take(lut, i, out=codes[y:y + block.shape[0]].reshape(-1), mode="clip")
+    return codes
+
+
+def label_map(rgb: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS) -> np.ndarray:
+    """uint8 label per pixel (LABEL_*), one class each by priority."""
+    with stage("labels"):
+        return CODE_TO_LABEL.take(class_codes(rgb, th))
+
+
+def use_lut(rgb: np.ndarray, lut: bool = None) -> bool:
+    """Whether to classify `rgb` through the lookup table (`lut` overrides the default).
+
+    Views that are not pixel-interleaved (an (H, W, 3) transpose of channel
+    planes, say) make the block copy the bottleneck, so they stay on the
+    fused comparisons.
+    """
+    if lut is None:
+        return (LUT_ENABLED and rgb.shape[0] * rgb.shape[1] >= LUT_MIN_PIXELS
+                and rgb.strides[1:] == (3, 1))
+    return lut and sys.byteorder == "little"
+
+
+def code_counts(code: np.ndarray) -> tuple:
+    """(bleach, algae, sediment) counts of a code plane, one popcount per rule bit.
+
+    Same numbers as counts_from_hist(np.bincount(code)), without bincount's
+    intp copy of the whole plane.
+    """
+    bit = scratch("codes.bit", code.shape)
+    return tuple(np.count_nonzero(np.bitwise_and(code, 1 << i, out=bit)) for i in range(3))
+
+
+def classify_counts(rgb: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS,
+                    lut: bool = None) -> tuple:
+    """Single pass over a uint8 RGB array -> (bleach, algae, sediment) pixel counts.
+
+    Counts of disjoint tiles simply add up. `lut` forces the lookup-table path
+    on or off; by default use_lut() decides.
+    """
+    codes = scratch("codes", rgb.shape[:2])
+    if use_lut(rgb, lut):
+        lut_codes(rgb, get_lut(th), out=codes)
+    else:
+        class_codes(rgb, th, out=codes)
+    return code_counts(codes)
+
+
+def result_from_counts(counts, total_pixels) -> dict:
+    """Turn per-class pixel counts into the rounded percentage dict used by the UI."""
+    bleach_n, algae_n, sediment_n = counts
+
+    bleach_percent   = (bleach_n   / total_pixels) * 100
+    algae_percent    = (algae_n    / total_pixels) * 100
+    sediment_percent = (sediment_n / total_pixels) * 100
+    healthy_percent  = max(0, 100 - (bleach_percent + algae_percent + sediment_percent))
+
+    return {
+        "bleach":   round(bleach_percent,   2),
+        "algae":    round(algae_percent,    2),
+        "sediment": round(sediment_percent, 2),
+        "health":   round(healthy_percent,  2),
+    }
+
+
+def resize_for_analysis(rgb: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """The fixed-size image every rule is evaluated on, written into `out` if given."""
+    with stage("resize"):
+        return cv2.resize(rgb, RESIZE_TO, dst=out)
+
+
+def analyze_array(rgb: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS,
+                  hist_bits: int = None, labels: bool = False):
+    """Analyse an already-decoded uint8 RGB array.
+
+    Returns R, or a tuple (R, ...) when extras are requested, in this order:
+    with `hist_bits`, a ColourHist so the image can later be re-scored under
+    other thresholds without decoding it; with `labels`, the RESIZE_TO-sized
+    label map, taken from the same class-code plane as the counts.
+
+    The resized image and code plane are per-thread scratch buffers, so in
+    steady state only the returned values are allocated.
+    """
+    w, h = RESIZE_TO
+    image = resize_for_analysis(rgb, scratch("analysis", (h, w, rgb.shape[2]), rgb.dtype))
+
+    total_pixels = image.shape[0] * image.shape[1]
+    with stage("classify"):
+        code = class_codes(image, th, out=scratch("codes", image.shape[:2]))
+        R = result_from_counts(code_counts(code), total_pixels)
+    extras = []
+    if hist_bits is not None:
+        extras.append(colour_hist(image, hist_bits))
+    if labels:
+        with stage("labels"):
+            extras.append(CODE_TO_LABEL.take(code))
+    return (R, *extras) if extras else R
+
+
+def analyze_bgr(bgr: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS) -> dict:
+    """Analyse a BGR frame (OpenCV order); channels are swapped after the resize."""
+    w, h = RESIZE_TO
+    image = cv2.resize(bgr, RESIZE_TO, dst=scratch("analysis", (h, w, 3)))[..., ::-1]
+
+    code = class_codes(image, th, out=scratch("codes", (h, w)))
+    return result_from_counts(code_counts(code), w * h)
+
+
+def analyze_image(pil_image, th: Thresholds = DEFAULT_THRESHOLDS, hist_bits: int = None):
+    with stage("to_array"):
+        rgb = pixels_into(pil_image)
+    return analyze_array(rgb, th, hist_bits)
+
+
+def analyze_thumbnail(fp, th: Thresholds = DEFAULT_THRESHOLDS, size: tuple = THUMB_SIZE) -> dict:
+    """Rough R from a `size` thumbnail, for a first answer before the full analysis; None for non-JPEGs.
+
+    Uses the camera's EXIF thumbnail when there is one (about a millisecond at
+    any image size), else a 1/8-scale DCT decode. Other formats can't be
+    decoded reduced, so their thumbnail would cost as much as the analysis.
+    """
+    with stage("thumbnail"), Image.open(fp) as im:
+        if im.format != "JPEG":
+            return None
+        embedded = exif_thumbnail(im)
+        with Image.open(io.BytesIO(embedded)) if embedded else contextlib.nullcontext(im) as src:
+            src.draft("RGB", size)
+            rgb = pixels_into(src, scratch("decode", (src.height, src.width, 3)))
+    thumb = cv2.resize(rgb, size, interpolation=cv2.INTER_AREA)
+    return result_from_counts(code_counts(class_codes(thumb, th)), size[0] * size[1])
+
+
+# ── Colour histogram intermediate ─────────────────────────────────────────────
+class ColourHist(NamedTuple):
+    """Sparse 3D colour histogram of the analysed pixels.
+
+    Bin i holds colours with quantised (r, g, b) = (i & m, i >> bits & m,
+    i >> 2*bits & m), m = 2**bits - 1. With bits=8 (the default) every colour
+    is its own bin and re-scoring is exact. Coarser bins are scored at their
+    centre, so a cut-off that falls inside a bin moves the whole bin to one
+    side: at 6 bits no default cut-off is on a bin edge, and algae comes out
+    about 3 points low. The index is sparse, so 8 bits costs only the colours
+    an image actually has (25-50 KB compressed for a 500 × 500 analysis image).
+    """
+    bits:   int
+    index:  np.ndarray   # uint32, sorted occupied bins
+    counts: np.ndarray   # uint32 pixels per bin
+
+    @property
+    def nbytes(self) -> int:
+        return self.index.nbytes + self.counts.nbytes
+
+
+def colour_hist(rgb: np.ndarray, bits: int = 8) -> ColourHist:
+    """Quantise an RGB array to 2**bits levels per channel and count each colour."""
+    shift = 8 - bits
+    flat = rgb.reshape(-1, 3)
+    n = flat.shape[0]
+    with stage("colour_hist"):
+        # index and run-start mask are scratch; only the (occupied bins) outputs are new
+        idx = scratch("hist.idx", (n,), np.uint32)
+        part = scratch("hist.part", (n,), np.uint32)
+        np.right_shift(flat[:, 0], shift, out=idx, dtype=np.uint32)
+        for c, to in ((1, bits), (2, 2 * bits)):
+            np.right_shift(flat[:, c], shift, out=part, dtype=np.uint32)
+            idx |= np.left_shift(part, to, out=part)
+        idx.sort()
+        first = scratch("hist.first", (n,), np.bool_)
+        first[:1] = True
+        np.not_equal(idx[1:], idx[:-1], out=first[1:])
+        index = idx[first]
+        starts = np.flatnonzero(first)
+        counts = np.diff(starts, append=n).astype(np.uint32)
+    return ColourHist(bits, index, counts)
+
+
+def hist_colours(hist: ColourHist) -> np.ndarray:
+    """Representative uint8 RGB colour (bin centre) of every occupied bin, shape (n, 3)."""
+    shift, mask = 8 - hist.bits, (1 << hist.bits) - 1
+    half = (1 << shift) >> 1
+    out = np.empty((hist.index.size, 3), dtype=np.uint8)
+    for c in range(3):
+        out[:, c] = ((hist.index >> (c * hist.bits)) & mask) << shift | half
+    return out
+
+
+def score_hist(hist: ColourHist, th: Thresholds = DEFAULT_THRESHOLDS) -> dict:
+    """Class percentages for any threshold set, from the histogram alone."""
+    with stage("score_hist"):
+        codes = class_codes(hist_colours(hist), th)
+        per_code = np.bincount(codes, weights=hist.counts, minlength=8).astype(np.int64)
+    return result_from_counts(counts_from_hist(per_code), hist.counts.sum(dtype=np.int64))
+
+
+def content_hash(data: bytes) -> str:
+    """Stable content address for an encoded image file."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decode_path(path) -> np.ndarray:
+    """Decode an image file on disk into a uint8 RGB array."""
+    with stage("decode"), Image.open(path) as im:
+        return pixels_into(im)
+
+
+class Decoded(NamedTuple):
+    """A decoded image plus what the decoder did to get it."""
+    rgb:       np.ndarray   # uint8 RGB, possibly reduced
+    full_size: tuple        # (width, height) of the stored image
+    scale:     int          # decode-time reduction factor (1, 2, 4 or 8)
+    decode_ms: float
+    captured:  str = None   # EXIF capture time, ISO 8601 camera-local, if present
+
+
+EXIF_IFD, EXIF_DATETIME_ORIGINAL, EXIF_DATETIME = 0x8769, 36867, 306
+EXIF_IFD1, EXIF_THUMB_OFFSET, EXIF_THUMB_LENGTH = -1, 0x0201, 0x0202
+
+
+def capture_time(im) -> str:
+    """EXIF DateTimeOriginal (else DateTime) of an open PIL image as ISO 8601, or None."""
+    exif = im.getexif()
+    raw = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    try:
+        return datetime.strptime(str(raw).strip("\x00 "), "%Y:%m:%d %H:%M:%S").isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def pixels_into(im, out: np.ndarray = None) -> np.ndarray:
+    """Copy a PIL image's RGB pixels into `out` (or a new (H, W, 3) uint8 array).
+
+    np.array(im) exports the pixels as one bytes object and then copies that;
+    here the raw encoder's chunks go straight into the destination, so the
+    only full-size allocation is the destination itself. The raw encoder is
+    not public Pillow API (requirements.txt pins the tested major version):
+    if it changes, this falls back to the public array export.
+    """
+    if im.mode != "RGB":
+        im = im.convert("RGB")
+    im.load()
+    w, h = im.size
+    rgb = np.empty((h, w, 3), np.uint8) if out is None else out
+    try:
+        _encode_into(im, rgb.reshape(-1))
+    except (AttributeError, TypeError, ValueError, RuntimeError):
+        rgb[...] = np.asarray(im)
+    return rgb
+
+
+def _encode_into(im, flat: np.ndarray):
+    """Run Pillow's raw RGB encoder over `im`, writing its chunks into `flat`."""
+    w, h = im.size
+    enc = Image._getencoder("RGB", "raw", "RGB")
+    enc.setimage(im.im, (0, 0, w, h))
+    pos = 0
+    while True:
+        _, err, chunk = enc.encode(max(65536, w * 4))
+        flat[pos:pos + len(chunk)] = np.frombuffer(chunk, np.uint8)
+        pos += len(chunk)
+        if err:
+            break
+    if err < 0 or pos != flat.size:
+        raise RuntimeError(f"raw encoder error {err} copying {w}x{h} pixels")
+
+
+def exif_thumbnail(im) -> bytes:
+    """The JPEG thumbnail most cameras embed in EXIF (IFD1) of an open PIL image, or None."""
+    raw = im.info.get("exif") or b""
+    ifd1 = im.getexif().get_ifd(EXIF_IFD1)
+    off, n = ifd1.get(EXIF_THUMB_OFFSET), ifd1.get(EXIF_THUMB_LENGTH)
+    if not (off and n and raw.startswith(b"Exif\x00\x00")):
+        return None
+    data = raw[6 + off:6 + off + n]   # offsets count from the TIFF header after "Exif\0\0"
+    return data if len(data) == n and data.startswith(b"\xff\xd8") else None
+
+
+def decode_reduced(fp, target: tuple = RESIZE_TO, pooled: bool = False) -> Decoded:
+    """Decode a path/file object no larger than needed to resize it to `target`.
+
+    JPEGs are decoded with libjpeg's DCT scaling (PIL draft mode) to the smallest
+    1/2, 1/4 or 1/8 size that is still at least `target`, so the final resize in
+    analyze_array is the only resampling step. Other formats decode in full.
+
+    With `pooled`, the pixels land in this thread's "decode" scratch buffer:
+    no allocation in steady state, but `rgb` is only valid until the thread's
+    next pooled decode.
+    """
+    t0 = time.perf_counter()
+    with stage("decode"), Image.open(fp) as im:
+        full_size = im.size
+        captured = capture_time(im)
+        if im.format == "JPEG":
+            im.draft("RGB", target)
+        out = scratch("decode", (im.height, im.width, 3)) if pooled else None
+        rgb = pixels_into(im, out)
+    scale = max(1, round(full_size[0] / rgb.shape[1]))
+    return Decoded(rgb, full_size, scale, (time.perf_counter() - t0) * 1000, captured)
@@ -0,0 +1,49 @@
+"""
+ReefScan · Ingest Pool
+======================
+Bounded thread pool that decodes and classifies uploads off the dashboard's
+script thread. Headless (no Streamlit imports), so it can be tested directly.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class IngestPool:
+    """Bounded thread pool that decodes and classifies uploads off the script thread.
+
+    PIL's decoders and cv2.resize release the GIL, so several uploads decode
+    in parallel. There is at most one job per content hash: a session that
+    needs an image already being ingested waits on the same future.
+    """
+
+    def __init__(self, workers: int):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reefscan-ingest")
+        self._jobs = {}   # content hash -> Future[Upload]
+        self._lock = threading.Lock()
+
+    def submit(self, h: str, fn, *args):
+        with self._lock:
+            job = self._jobs.get(h)
+            if job is not None:
+                return job
+            # run in a copy of the caller's context so stage timings reach its session
+            job = self._jobs[h] = self._pool.submit(contextvars.copy_context().run, fn, *args)
+        # Outside the lock: a job that has already finished runs the callback
+        # inline, and _done takes the lock.
+        job.add_done_callback(lambda fut: self._done(h, fut))
+        return job
+
+    def pending(self, h: str):
+        """The in-flight job for `h`, or None."""
+        with self._lock:
+            return self._jobs.get(h)
+
+    def _done(self, h: str, job):
+        with self._lock:
+            if self._jobs.get(h) is job:
+                del self._jobs[h]
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,45 @@
+"""
+ReefScan · Label Overlay
+========================
+Palette-based overlay of the per-pixel label map on the input image: one
+table lookup for the colours, one weighted blend and one masked copy —
+a few milliseconds per image, no matplotlib.
+"""
+
+import cv2
+import numpy as np
+
+from reefscan.engine import LABEL_HEALTHY
+from reefscan.timing import stage
+
+# Same colours as the dashboard charts (C_BLEACH, C_ALGAE, C_SEDIMENT)
+PALETTE = np.array([
+    [0,   0,   0],     # healthy — left untinted
+    [144, 202, 249],   # bleaching
+    [105, 240, 174],   # algae
+    [255, 204, 128],   # sediment
+], dtype=np.uint8)
+
+OVERLAY_ALPHA = 0.55
+OVERLAY_MAX_SIDE = 800
+
+
+def fit_within(rgb: np.ndarray, max_side: int = OVERLAY_MAX_SIDE) -> np.ndarray:
+    """Downscale (never upscale) so the longer side is at most max_side."""
+    h, w = rgb.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return rgb
+    return cv2.resize(rgb, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def render_overlay(rgb: np.ndarray, labels: np.ndarray, alpha: float = OVERLAY_ALPHA) -> np.ndarray:
+    """Blend label colours onto `rgb`; `labels` is stretched to its size if needed."""
+    h, w = rgb.shape[:2]
+    with stage("overlay"):
+        if labels.shape != (h, w):
+            labels = cv2.resize(labels, (w, h), interpolation=cv2.INTER_NEAREST)
+        tint = cv2.addWeighted(rgb, 1 - alpha, PALETTE.take(labels, axis=0), alpha, 0)
+        out = rgb.copy()
+        cv2.copyTo(tint, (labels != LABEL_HEALTHY).view(np.uint8), out)
+    return out
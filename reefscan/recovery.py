@@ -0,0 +1,86 @@
+"""
+ReefScan · Recovery Model
+=========================
+Logistic recovery curves per ecosystem, with the "improved" path boosted by
+the image's health score. Shared by the matplotlib and Vega-Lite charts.
+
+The curves are a Monte-Carlo ensemble rather than one line each: SCENARIOS
+parameter sets per path are drawn around the nominal (L, k, t0), evaluated
+in one (ecosystems × paths × months × scenarios) broadcast, and reduced to percentile
+bands. Parameter noise is multiplicative on L, so the height-1 bands don't
+depend on the health score; they are computed once per process, and per
+image only the boosted height is applied. Scaling by a positive factor and
+clipping to [0, 1] commute with percentiles, so this is exact.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+MONTHS = 50
+POINTS = 101                        # months sampled across the chart
+SCENARIOS = 10_000                  # parameter sets per path
+PERCENTILES = (10, 25, 50, 75, 90)  # band edges: 10–90, 25–75 (IQR), median
+SPREAD = {"L": 0.06, "k": 0.20, "t0": 2.0}   # lognormal σ of L and k; normal σ of t0 (months)
+SEED = 0
+
+
+def logi(t, L, k, t0):
+    return L / (1 + np.exp(-k * (t - t0)))
+
+
+def ecosystems(boost: float) -> dict:
+    """name -> (baseline params, improved params, baseline colour, improved colour)."""
+    return {
+        "Coral Reef":      (dict(L=0.88, k=0.18, t0=8),  dict(L=0.98, k=0.22, t0=6),  "#90CAF9", "#42A5F5"),
+        "Seagrass Meadow": (dict(L=0.80, k=0.13, t0=12), dict(L=0.95, k=0.17, t0=9),  "#A5D6A7", "#66BB6A"),
+        "Mangrove Forest": (dict(L=0.72, k=0.10, t0=16),
+                            dict(L=min(0.88 + boost * 0.5, 1.0), k=0.13, t0=12),
+                            "#CE93D8", "#AB47BC"),
+    }
+
+
+@lru_cache(maxsize=4)
+def unit_bands(points: int = POINTS, n: int = SCENARIOS, seed: int = SEED) -> np.ndarray:
+    """(ecosystem, path, percentile, month) bands of the ensemble with nominal L = 1.
+
+    Path 0 is the baseline, path 1 the improved curve. Only k and t0 shape a
+    curve, and neither depends on the health score, so this is computed once.
+    """
+    shape = np.array([[(p["k"], p["t0"]) for p in (bp, ip)]
+                      for bp, ip, _, _ in ecosystems(0.0).values()])   # (E, 2, 2)
+    rng = np.random.default_rng(seed)
+    size = shape.shape[:2] + (1, n)
+    u = rng.lognormal(0.0, SPREAD["L"], size).astype(np.float32)
+    k = (shape[..., 0, None, None] * rng.lognormal(0.0, SPREAD["k"], size)).astype(np.float32)
+    t0 = (shape[..., 1, None, None] + rng.normal(0.0, SPREAD["t0"], size)).astype(np.float32)
+    t = np.linspace(0, MONTHS, points, dtype=np.float32)[:, None]
+    # (E, 2, months, scenarios): scenarios last and contiguous, so the sort is
+    # one vectorised pass per month (several times quicker than np.percentile)
+    curves = np.sort(logi(t, u, k, t0), axis=-1)
+    # linear interpolation between order statistics, as np.percentile does
+    pos = np.asarray(PERCENTILES) / 100 * (n - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n - 1)
+    w = (pos - lo).astype(np.float32)
+    bands = curves[..., lo] * (1 - w) + curves[..., hi] * w       # (E, 2, months, q)
+    bands = np.ascontiguousarray(np.swapaxes(bands, -1, -2))
+    bands.setflags(write=False)
+    return bands
+
+
+def recovery_bands(health: float, points: int = POINTS) -> list:
+    """[(name, baseline, improved, baseline colour, improved colour)], each band
+    array (len(PERCENTILES), points) of recovery level per percentile and month."""
+    boost = health / 100.0
+    unit = unit_bands(points, SCENARIOS, SEED)
+    out = []
+    for e, (name, (bp, ip, cb, ci)) in enumerate(ecosystems(boost).items()):
+        yb = np.clip(unit[e, 0] * bp["L"], 0, 1)
+        yi = np.clip(unit[e, 1] * (ip["L"] * (1 + boost * 0.15)), 0, 1)
+        out.append((name, yb, yi, cb, ci))
+    return out
+
+
+def months(points: int = POINTS) -> np.ndarray:
+    return np.linspace(0, MONTHS, points)
@@ -0,0 +1,263 @@
+"""
+ReefScan · Report Model
+=======================
+Everything a report says about one result, independent of how it is shown:
+the status banner (CSS class, icon, title, description) and the analyst-style
+commentary for each chart. Commentary strings carry inline <b> markup and
+are meant to be dropped into HTML as-is. survey_summary() aggregates many
+results at once for the comparison overview.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from reefscan.engine import METRICS
+from reefscan.recovery import SCENARIOS
+
+
+# ── Status ─────────────────────────────────────────────────────────────────────
+def get_status(score):
+    if score >= 65:
+        return "alert-good",    "✅", "Good Health",
+    elif score >= 35:
+        return "alert-warning", "⚠️", "Moderate Stress"
+    else:
+        return "alert-danger",  "🚨", "Critical Condition"
+
+
+def get_status_desc(score):
+    if score >= 65:
+        return "Ecosystem conditions are stable. Reef biodiversity appears well-maintained."
+    elif score >= 35:
+        return "Ecosystem shows signs of environmental stress. Monitoring recommended."
+    else:
+        return "Severe degradation detected. Immediate intervention may be required."
+
+
+# ── Analyst-style commentary (reads like a marine biologist's report) ──────────
+def explain_bar(R):
+    b, a, s, h = R["bleach"], R["algae"], R["sediment"], R["health"]
+
+    # --- Bleaching interpretation ---
+    if b > 40:
+        bleach_txt = (f"Coral bleaching has reached a <b style='color:#90CAF9'>critical {b:.1f}%</b>. "
+                      f"This level indicates mass thermal stress — the coral polyps have expelled their symbiotic algae and are at high risk of mortality if conditions do not improve within weeks.")
+    elif b > 20:
+        bleach_txt = (f"Bleaching is at a <b style='color:#90CAF9'>concerning {b:.1f}%</b>. "
+                      f"A significant portion of the reef structure is under stress. Prolonged exposure to the current conditions will likely push this into a critical range.")
+    elif b > 8:
+        bleach_txt = (f"Mild bleaching detected at <b style='color:#90CAF9'>{b:.1f}%</b>. "
+                      f"While not immediately alarming, this is an early warning that temperature or water quality stress is present.")
+    else:
+        bleach_txt = (f"Bleaching is minimal at <b style='color:#90CAF9'>{b:.1f}%</b> — "
+                      f"coral polyps appear largely healthy and pigmented.")
+
+    # --- Algae interpretation ---
+    if a > 40:
+        algae_txt = (f"Algae bloom coverage at <b style='color:#69F0AE'>{a:.1f}%</b> is aggressive. "
+                     f"Dense algae is actively competing with and smothering coral tissue, blocking sunlight and consuming oxygen in the water column.")
+    elif a > 20:
+        algae_txt = (f"Algae at <b style='color:#69F0AE'>{a:.1f}%</b> is moderate-to-high. "
+                     f"Nutrient enrichment (often from runoff) is likely fuelling this growth. Left unchecked it will outcompete coral for space.")
+    elif a > 8:
+        algae_txt = (f"Algae presence is low-moderate at <b style='color:#69F0AE'>{a:.1f}%</b>. "
+                     f"This is within a manageable range but should be monitored for upward trends.")
+    else:
+        algae_txt = (f"Algae is well-controlled at <b style='color:#69F0AE'>{a:.1f}%</b> — "
+                     f"a healthy grazer fish population is likely keeping growth in check.")
+
+    # --- Sediment interpretation ---
+    if s > 30:
+        sediment_txt = (f"Sediment turbidity is <b style='color:#FFCC80'>very high at {s:.1f}%</b>. "
+                        f"This level drastically reduces light penetration, suffocates coral polyps, and signals significant erosion or disturbance upstream.")
+    elif s > 15:
+        sediment_txt = (f"Sediment at <b style='color:#FFCC80'>{s:.1f}%</b> is elevated. "
+                        f"Visibility is being reduced and coral growth rates are likely suppressed. Investigate for nearby construction, dredging, or storm runoff.")
+    else:
+        sediment_txt = (f"Sediment levels are low at <b style='color:#FFCC80'>{s:.1f}%</b> — "
+                        f"water clarity appears good, supporting adequate light for photosynthesis.")
+
+    # --- Overall verdict ---
+    if h >= 65:
+        verdict = f"<b style='color:#27AE60'>Overall the reef is in good health ({h:.1f}%).</b> Stressor levels are within acceptable bounds. Routine monitoring is sufficient."
+    elif h >= 35:
+        verdict = f"<b style='color:#F4D03F'>Overall health is moderate ({h:.1f}%).</b> The combination of stressors above is having a measurable impact. A targeted conservation plan is recommended."
+    else:
+        verdict = f"<b style='color:#C0392B'>Overall health is critically low ({h:.1f}%).</b> Multiple stressors are compounding each other. Immediate scientific assessment and intervention are strongly advised."
+
+    return f"{bleach_txt}<br><br>{algae_txt}<br><br>{sediment_txt}<br><br>{verdict}"
+
+
+def explain_donut(R):
+    b, a, s, h = R["bleach"], R["algae"], R["sediment"], R["health"]
+    total_stress = b + a + s
+
+    if h >= 65:
+        composition_txt = (
+            f"The composition chart confirms a predominantly healthy reef ecosystem. "
+            f"<b style='color:#00D4FF'>{h:.1f}%</b> of the image represents unimpacted, healthy water and coral — "
+            f"the dominant slice by a clear margin. The remaining {total_stress:.1f}% split across stressors "
+            f"is within the natural variation expected in a functioning reef system."
+        )
+        action = "Continue regular monitoring. No urgent intervention required."
+    elif h >= 35:
+        composition_txt = (
+            f"The donut reveals a reef under measurable stress. Healthy water accounts for only "
+            f"<b style='color:#00D4FF'>{h:.1f}%</b> of the composition, while combined stressors "
+            f"(bleaching {b:.1f}% + algae {a:.1f}% + sediment {s:.1f}%) consume <b>{total_stress:.1f}%</b> — "
+            f"more than a third of the ecosystem is compromised. The balance is shifting away from coral dominance."
+        )
+        action = "Localised intervention, water quality testing, and increased monitoring frequency are recommended."
+    else:
+        composition_txt = (
+            f"The composition tells a stark story: stressors account for <b style='color:#C0392B'>{total_stress:.1f}%</b> "
+            f"of the ecosystem while healthy water has collapsed to just <b style='color:#00D4FF'>{h:.1f}%</b>. "
+            f"This inversion — where damage outweighs health — is a hallmark of a reef in ecological crisis. "
+            f"Bleaching ({b:.1f}%), algae ({a:.1f}%), and sediment ({s:.1f}%) are all contributing to a cascading decline."
+        )
+        action = "Urgent scientific assessment and active restoration (coral transplanting, algae removal, runoff control) are critically needed."
+
+    return f"{composition_txt}<br><br>⚡ <b>Recommended Action:</b> {action}"
+
+
+def explain_gauge(R):
+    h = R["health"]
+
+    if h >= 75:
+        reading = (
+            f"The gauge needle sits firmly in the <b style='color:#27AE60'>Good zone at {h:.1f}%</b>. "
+            f"This score reflects a reef where ecological processes are functioning well — "
+            f"coral growth is outpacing mortality, grazers are controlling algae, and water quality is supporting photosynthesis. "
+            f"Reefs in this range show strong resilience and can recover from minor disturbances on their own."
+        )
+        outlook = "Outlook is positive. Maintain current water quality and minimise human disturbance to preserve this score."
+    elif h >= 50:
+        reading = (
+            f"The needle falls in the <b style='color:#F4D03F'>Fair zone at {h:.1f}%</b>. "
+            f"The reef is functional but showing signs of strain. At this score, coral recruitment may be slowing, "
+            f"and the ecosystem's ability to self-repair after bleaching events or storms is reduced. "
+            f"It is not in crisis, but it is trending in the wrong direction if stressors are not addressed."
+        )
+        outlook = "Outlook is cautious. Water quality management and reduction of local stressors (fishing pressure, runoff) are needed to prevent further decline."
+    elif h >= 25:
+        reading = (
+            f"The needle points to the <b style='color:#E67E22'>Poor zone at {h:.1f}%</b>. "
+            f"This score indicates significant ecological degradation. Coral cover is likely declining, "
+            f"algae is gaining dominance, and biodiversity is shrinking. The reef's natural recovery mechanisms "
+            f"are overwhelmed — passive conservation alone will not be sufficient."
+        )
+        outlook = "Outlook is concerning. Active intervention — including coral nursery programs, algae removal, and strict no-take zones — should be implemented urgently."
+    else:
+        reading = (
+            f"The needle has dropped into the <b style='color:#C0392B'>Critical zone at {h:.1f}%</b>. "
+            f"This represents near-total ecological collapse in the scanned area. "
+            f"At this level, coral framework destruction is advanced, biodiversity has crashed, "
+            f"and natural recovery without direct human intervention is considered unlikely within any reasonable timeframe."
+        )
+        outlook = "Outlook is severe. Emergency reef restoration protocols should be activated. Document the site for scientific record and prioritise stabilisation."
+
+    return f"{reading}<br><br>🔭 <b>Outlook:</b> {outlook}"
+
+
+def explain_recovery(R):
+    h = R["health"]
+    boost = h / 100.0
+
+    if h >= 65:
+        trajectory = (
+            f"With a health score of <b style='color:#00D4FF'>{h:.1f}%</b>, the simulation projects a <b>strong recovery trajectory</b>. "
+            f"The solid lines (boosted path) rise noticeably above the dashed baseline across all three ecosystems — "
+            f"Coral Reef, Seagrass Meadow, and Mangrove Forest. This gap represents the real-world benefit "
+            f"of maintaining current health levels. Coral Reef recovery is projected to approach near-full levels "
+            f"within 30–40 months under these conditions."
+        )
+        recommendation = (
+            f"The reef has strong natural recovery capacity. Protecting this site from new stressors "
+            f"(overfishing, pollution, anchor damage) will allow the projected recovery to materialise."
+        )
+    elif h >= 35:
+        trajectory = (
+            f"At <b style='color:#00D4FF'>{h:.1f}%</b> health, the simulation shows a <b>moderate recovery gap</b> "
+            f"between the dashed baseline and solid boosted lines. Recovery is possible, but it will be slower "
+            f"and more fragile than a healthy reef. The Mangrove Forest curve in particular shows limited uplift "
+            f"at this health level — mangroves require stable, low-stress conditions to regenerate effectively. "
+            f"Without improvement, the solid lines may converge back toward the baseline within 20–30 months."
+        )
+        recommendation = (
+            f"Active support is needed to widen the recovery gap — water quality improvement, "
+            f"reducing sedimentation, and supplementing natural recruitment with coral transplanting."
+        )
+    else:
+        trajectory = (
+            f"At a critically low health score of <b style='color:#00D4FF'>{h:.1f}%</b>, the simulation paints a difficult picture. "
+            f"The gap between the dashed baseline and solid lines is very narrow — meaning the ecosystem has "
+            f"little capacity to recover beyond its already-degraded baseline. All three ecosystems "
+            f"(Coral Reef, Seagrass, Mangrove) show suppressed recovery curves, and full recovery "
+            f"within the 50-month window is unlikely without major external intervention."
+        )
+        recommendation = (
+            f"Natural recovery alone is insufficient at this health level. "
+            f"Structured restoration programmes — coral seeding, nutrient runoff control, and enforced marine protection — "
+            f"are required to shift the trajectory upward."
+        )
+
+    spread = (
+        f"Each line is the median of {SCENARIOS:,} simulated scenarios with varied growth rates, "
+        f"timing and ceilings; the shaded bands hold the middle 50% and 80% of them, so wide bands "
+        f"mean the outcome is uncertain rather than the projection being wrong."
+    )
+    return f"{trajectory} {spread}<br><br>📋 <b>Recommendation:</b> {recommendation}"
+
+
+class Report(NamedTuple):
+    """Text content of one image report."""
+    status_cls: str
+    icon: str
+    title: str
+    desc: str
+    bar: str
+    donut: str
+    gauge: str
+    recovery: str
+
+
+def build_report(R: dict) -> Report:
+    """Assemble the report text for a result dict from analyze_*."""
+    cls, icon, title = get_status(R["health"])
+    return Report(cls, icon, title, get_status_desc(R["health"]),
+                  explain_bar(R), explain_donut(R), explain_gauge(R), explain_recovery(R))
+
+
+# ── Survey aggregates ──────────────────────────────────────────────────────────
+PERCENTILES = (5, 25, 50, 75, 95)
+HIST_EDGES = np.linspace(0, 100, 21)            # 5-point bins
+STATUS_CUTS = (35, 65)                         # get_status(): critical < 35 <= moderate < 65 <= good
+
+
+def results_array(results) -> np.ndarray:
+    """(n, 4) float array of bleach/algae/sediment/health from result dicts."""
+    return np.array([[R[m] for m in METRICS] for R in results], dtype=np.float64).reshape(-1, 4)
+
+
+def survey_summary(values: np.ndarray) -> dict:
+    """Vectorised aggregates over a results_array: mean, percentiles, 5-point
+    histograms per metric and the number of images in each status band."""
+    n = len(values)
+    if n == 0:
+        return {"n": 0}
+    pct = np.percentile(values, PERCENTILES, axis=0)          # (len(PERCENTILES), 4)
+    # one bincount for all four metrics: offset each metric's bin indices
+    nb = len(HIST_EDGES) - 1
+    bins = np.clip(np.searchsorted(HIST_EDGES, values, side="right") - 1, 0, nb - 1)
+    hist = np.bincount((bins + np.arange(4) * nb).ravel(), minlength=4 * nb).reshape(4, nb)
+    bands = np.bincount(np.searchsorted(STATUS_CUTS, values[:, 3], side="right"), minlength=3)
+    return {
+        "n":           n,
+        "mean":        dict(zip(METRICS, values.mean(axis=0).round(2).tolist())),
+        "percentiles": {m: dict(zip(PERCENTILES, pct[:, i].round(2).tolist()))
+                        for i, m in enumerate(METRICS)},
+        "edges":       HIST_EDGES.tolist(),
+        "hist":        dict(zip(METRICS, hist.tolist())),
+        "status":      dict(zip(("critical", "moderate", "good"), bands.tolist())),
+    }
@@ -0,0 +1,127 @@
+"""
+ReefScan · Sampling Estimator
+=============================
+Fast coverage estimates for triage over large archives, where a percentage
+good to ±0.5 points is enough. Instead of classifying every pixel, short
+horizontal runs of pixels (one cache line each, so memory-mapped inputs only
+page in what is read) are drawn at random within each cell of a grid laid
+over the image: stratified sampling. After a first round, the observed
+variance says how many more runs reach the requested precision; sampling
+stops as soon as every percentage's confidence interval is that narrow.
+
+Estimates are of the full-resolution coverage, i.e. what analyze_tiled
+computes exactly. Runs are the sampling unit, so each stratum's variance is
+that of its run means and neighbouring pixels of the same class are not
+counted as independent evidence. Square blocks were tried and carry little
+more information than single pixels on clumpy reef imagery.
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from reefscan.engine import (
+    DEFAULT_THRESHOLDS,
+    METRICS,
+    Thresholds,
+    class_codes,
+    classify_counts,
+    result_from_counts,
+)
+from reefscan.timing import stage
+
+GRID = 64            # strata per side
+RUN = 4              # pixels per sampling unit: a horizontal run, 12 bytes of one row
+FIRST_ROUND = 2      # units per stratum in the first round
+MARGIN = 1.2         # later rounds aim this far past the size the variance predicts
+MAX_FRACTION = 0.1   # past this share of the pixels, a full pass is about as fast, and exact
+
+
+def _strata(height: int, width: int, run: int, grid: int):
+    """Cell edges along each axis, every cell at least one row by one run."""
+    gy, gx = max(1, min(grid, height)), max(1, min(grid, width // run))
+    return (np.linspace(0, height, gy + 1).astype(np.int64),
+            np.linspace(0, width, gx + 1).astype(np.int64))
+
+
+def _draw(rng, ys, xs, per_stratum: int, width: int, run: int):
+    """Row and first column of `per_stratum` random runs in every cell, stratum id of each."""
+    gy, gx = len(ys) - 1, len(xs) - 1
+    cell = np.repeat(np.arange(gy * gx), per_stratum)
+    cy, cx = np.divmod(cell, gx)
+    # start uniform over the cell, clamped so the run stays inside the row
+    y = ys[cy] + (rng.random(cell.size) * (ys[cy + 1] - ys[cy])).astype(np.int64)
+    x0 = xs[cx] + (rng.random(cell.size) * (xs[cx + 1] - xs[cx])).astype(np.int64)
+    return y, np.minimum(x0, width - run), cell
+
+
+def _run_means(rgb: np.ndarray, y, x0, run: int, th: Thresholds) -> np.ndarray:
+    """(n_runs, 3) fraction of each run's pixels flagged bleach, algae, sediment."""
+    pixels = rgb[y[:, None], x0[:, None] + np.arange(run)]
+    codes = class_codes(pixels, th)
+    return np.stack([np.count_nonzero(codes & (1 << i), axis=1) for i in range(3)],
+                    axis=1) / run
+
+
+def estimate_array(rgb: np.ndarray, th: Thresholds = DEFAULT_THRESHOLDS,
+                   precision: float = 0.5, confidence: float = 0.95,
+                   run: int = RUN, grid: int = GRID, seed: int = None) -> dict:
+    """Estimate the four percentages of an (H, W, 3) uint8 array to ±`precision` points.
+
+    Returns the usual R keys plus, for each metric, `<metric>_ci` (the
+    half-width of its `confidence` interval, in percentage points) and
+    `sampled` (pixels classified). Small images, or ones that would need more
+    than MAX_FRACTION of their pixels, get a full pass with zero-width intervals.
+    """
+    height, width = rgb.shape[:2]
+    total = height * width
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    run = max(1, min(run, width))
+    ys, xs = _strata(height, width, run, grid)
+    n_strata = (len(ys) - 1) * (len(xs) - 1)
+    weights = (np.diff(ys)[:, None] * np.diff(xs)[None, :]).ravel() / total
+    budget = MAX_FRACTION * total / run
+    rng = np.random.default_rng(seed)
+
+    means, cells = [], []
+    drawn, target = 0, FIRST_ROUND * n_strata
+    with stage("estimate"):
+        while target <= budget:
+            y, x0, cell = _draw(rng, ys, xs, -(-(target - drawn) // n_strata), width, run)
+            means.append(_run_means(rgb, y, x0, run, th))
+            cells.append(cell)
+            drawn += cell.size
+            est, half = _stratified(np.concatenate(means), np.concatenate(cells),
+                                    weights, n_strata, z)
+            if half.max() <= precision:
+                break
+            # the half-width shrinks as 1/sqrt(n): size the next round to reach the target
+            target = math.ceil(drawn * (half.max() / precision) ** 2 * MARGIN)
+        else:
+            # precision not reachable within the sampling budget: count everything
+            R = {m: float(v) for m, v in result_from_counts(classify_counts(rgb, th), total).items()}
+            return {**R, **{f"{m}_ci": 0.0 for m in METRICS}, "sampled": total}
+
+    R = {m: round(max(0.0, float(v)), 2) for m, v in zip(METRICS, est)}
+    return {**R, **{f"{m}_ci": round(float(h), 2) for m, h in zip(METRICS, half)},
+            "sampled": drawn * run}
+
+
+def _stratified(means: np.ndarray, cells: np.ndarray, weights: np.ndarray,
+                n_strata: int, z: float):
+    """Stratified estimates and CI half-widths, in percent, for the four metrics.
+
+    Health is scored per run as 1 - (bleach + algae + sediment), so its
+    interval reflects the covariance of the three classes.
+    """
+    y = np.column_stack([means, 1 - means.sum(axis=1)])
+    m = np.bincount(cells, minlength=n_strata).astype(np.float64)
+    s1 = np.stack([np.bincount(cells, y[:, k], n_strata) for k in range(4)], axis=1)
+    s2 = np.stack([np.bincount(cells, y[:, k] ** 2, n_strata) for k in range(4)], axis=1)
+    mean = s1 / m[:, None]
+    # unbiased within-stratum variance of run means (needs 2+ runs per stratum)
+    var = np.maximum(s2 - m[:, None] * mean ** 2, 0) / np.maximum(m - 1, 1)[:, None]
+    est = weights @ mean
+    se = np.sqrt((weights ** 2 / m) @ var)
+    return est * 100, z * se * 100
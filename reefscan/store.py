@@ -0,0 +1,209 @@
+"""
+ReefScan · Results Store
+========================
+SQLite persistence for analysis results, so a survey that has been seen
+before is a lookup instead of a re-decode. One row per (content hash,
+threshold set) holds the image metadata (file name, site tag, EXIF capture
+time, dimensions, size) and the four percentages. (hash, thresholds) is the
+primary key; site and capture time are indexed for survey queries.
+
+Writes are buffered and committed in one transaction per flush(); the
+database runs in WAL mode so readers (pool workers, other sessions) don't
+block the writer.
+
+    python -m reefscan query results.sqlite --site north-reef --since 2024-01-01
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from reefscan.engine import DEFAULT_THRESHOLDS, METRICS, RESIZE_TO, Thresholds, cache_dir
+
+META = ("file", "site", "captured", "width", "height", "bytes")
+COLUMNS = ("hash", "thresholds") + META + METRICS + ("analysed",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    hash       TEXT NOT NULL,
+    thresholds TEXT NOT NULL,
+    file       TEXT,
+    site       TEXT,
+    captured   TEXT,
+    width      INTEGER,
+    height     INTEGER,
+    bytes      INTEGER,
+    bleach     REAL NOT NULL,
+    algae      REAL NOT NULL,
+    sediment   REAL NOT NULL,
+    health     REAL NOT NULL,
+    analysed   TEXT NOT NULL,
+    PRIMARY KEY (hash, thresholds)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_site_captured ON results (site, captured);
+CREATE INDEX IF NOT EXISTS results_captured ON results (captured);
+"""
+
+# Keep the first-seen metadata, fill gaps from later sightings, refresh the result.
+UPSERT = f"""
+INSERT INTO results ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})
+ON CONFLICT (hash, thresholds) DO UPDATE SET
+    {", ".join(f"{c} = COALESCE(results.{c}, excluded.{c})" for c in META)},
+    {", ".join(f"{c} = excluded.{c}" for c in METRICS + ("analysed",))}
+"""
+
+
+def default_path() -> Path:
+    return Path(os.environ.get("REEFSCAN_DB", cache_dir() / "results.sqlite"))
+
+
+def threshold_key(th: Thresholds = DEFAULT_THRESHOLDS) -> str:
+    """Results depend on the thresholds and the analysis size, so both are in the key."""
+    return ",".join(map(str, (*th, *RESIZE_TO)))
+
+
+class ResultStore:
+    """Thread-safe SQLite result store with a buffered, batched writer."""
+
+    def __init__(self, path=None, flush_every: int = 500, readonly: bool = False):
+        self.path = Path(path or default_path())
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = []
+        if readonly:
+            self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                       check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        self._db.row_factory = sqlite3.Row
+
+    # ── reads ────────────────────────────────────────────────────────────────
+    def get(self, content_hash: str, th: Thresholds = DEFAULT_THRESHOLDS) -> dict:
+        """The stored result dict for one image, or None."""
+        return self.get_many([content_hash], th).get(content_hash)
+
+    def get_many(self, hashes, th: Thresholds = DEFAULT_THRESHOLDS, meta: bool = False) -> dict:
+        """{hash: result dict} for the hashes that are stored (pending rows included).
+
+        With `meta`, each dict also carries the stored META columns.
+        """
+        key = threshold_key(th)
+        cols = METRICS + META if meta else METRICS
+        hashes = list(dict.fromkeys(hashes))
+        wanted = set(hashes)
+        out = {}
+        with self._lock:
+            for row in self._pending:
+                if row["thresholds"] == key and row["hash"] in wanted:
+                    out[row["hash"]] = {c: row[c] for c in cols}
+            # stay under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 900):
+                part = hashes[i:i + 900]
+                cur = self._db.execute(
+                    f"SELECT hash, {', '.join(cols)} FROM results "
+                    f"WHERE thresholds = ? AND hash IN ({', '.join('?' * len(part))})",
+                    [key, *part])
+                for r in cur:
+                    out.setdefault(r["hash"], {c: r[c] for c in cols})
+        return out
+
+    def query(self, site: str = None, since: str = None, until: str = None,
+              th: Thresholds = DEFAULT_THRESHOLDS, limit: int = None) -> list:
+        """Stored rows for one threshold set, filtered by site and capture time, oldest first."""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results WHERE thresholds = ?"
+        args = [threshold_key(th)]
+        if site is not None:
+            sql += " AND site = ?"
+            args.append(site)
+        if since is not None:
+            sql += " AND captured >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND captured < ?"
+            args.append(until)
+        sql += " ORDER BY captured, hash"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        self.flush()
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, args)]
+
+    def count(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    # ── writes ───────────────────────────────────────────────────────────────
+    def add(self, content_hash: str, R: dict, th: Thresholds = DEFAULT_THRESHOLDS, **meta):
+        """Queue one result; it is written with the next flush (automatic every flush_every rows)."""
+        row = {c: meta.get(c) for c in META}
+        row.update(hash=content_hash, thresholds=threshold_key(th),
+                   analysed=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                   **{m: float(R[m]) for m in METRICS})
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every queued row in a single transaction; returns the number written."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            if rows:
+                with self._db:
+                    self._db.executemany(UPSERT, [[r[c] for c in COLUMNS] for r in rows])
+        return len(rows)
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+def main(args) -> int:
+    from reefscan.batch import open_output
+
+    if not Path(args.db).exists():
+        print(f"No results store at {args.db}", file=sys.stderr)
+        return 1
+    th = Thresholds(*args.thresholds)
+    with ResultStore(args.db, readonly=True) as store:
+        rows = store.query(site=args.site, since=args.since, until=args.until,
+                           th=th, limit=args.limit)
+    with open_output(args.output, args.format, list(COLUMNS)) as writer:
+        for row in rows:
+            writer.write(row)
+    print(f"{len(rows)} results", file=sys.stderr)
+    return 0
+
+
+def add_parser(sub):
+    p = sub.add_parser("query", help="list stored results by site and capture time")
+    p.add_argument("db", nargs="?", default=str(default_path()),
+                   help="results store (default: $REEFSCAN_DB or the cache dir)")
+    p.add_argument("--site", help="only this site tag")
+    p.add_argument("--since", help="captured at or after this ISO date/time")
+    p.add_argument("--until", help="captured before this ISO date/time")
+    p.add_argument("--thresholds", type=int, nargs=4, default=list(DEFAULT_THRESHOLDS),
+                   metavar=("BLEACH", "ALGAE", "SEDIMENT_R", "SEDIMENT_B"),
+                   help="integer 0-255 cut-offs the results were computed with (default: %(default)s)")
+    p.add_argument("--limit", type=int)
+    p.add_argument("-o", "--output", default="-", help="CSV/JSONL output path, '-' for stdout")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="default: from output suffix, else csv")
+    p.set_defaults(func=main)
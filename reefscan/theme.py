@@ -0,0 +1,20 @@
+"""Colour palette shared by every chart backend."""
+
+CHART_BG   = "#0D1525"
+C_BLEACH   = "#90CAF9"
+C_ALGAE    = "#69F0AE"
+C_SEDIMENT = "#FFCC80"
+C_HEALTH   = "#00D4FF"
+
+C_TITLE = "#C5DEF8"
+C_LABEL = "#B0CCDE"
+C_AXIS  = "#2D5A78"
+C_MUTED = "#4A7A96"
+
+# Health gauge zones: (start %, end %, colour, label)
+GAUGE_ZONES = [
+    (0,  25,  "#C0392B", "Critical"),
+    (25, 50,  "#E67E22", "Poor"),
+    (50, 75,  "#F4D03F", "Fair"),
+    (75, 100, "#27AE60", "Good"),
+]
@@ -0,0 +1,123 @@
+"""
+ReefScan · Tiled Analysis
+=========================
+Full-resolution analysis of very large images (photogrammetry orthomosaics)
+without the 500 × 500 resize. The image is read in fixed-size windows, each
+window is classified on a thread pool and the per-class counts are summed,
+so the result is exact and scratch memory is bounded by tile size × workers.
+
+Inputs larger than memory should be given as raw interleaved RGB (or .npy)
+and are memory-mapped; the OS pages windows in and out as they are read.
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from reefscan.engine import (
+    DEFAULT_THRESHOLDS,
+    Thresholds,
+    classify_counts,
+    get_lut,
+    result_from_counts,
+    use_lut,
+)
+from reefscan.sampling import estimate_array
+
+DEFAULT_TILE = 2048
+
+
+def open_memmap(path, shape=None) -> np.ndarray:
+    """Memory-map an (H, W, 3) uint8 image: a .npy file, or raw RGB bytes with `shape`."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        arr = np.load(path, mmap_mode="r")
+    else:
+        if shape is None:
+            raise ValueError("raw RGB input needs its (height, width)")
+        arr = np.memmap(path, dtype=np.uint8, mode="r", shape=(shape[0], shape[1], 3))
+    if arr.dtype != np.uint8 or arr.ndim != 3 or arr.shape[2] != 3:
+        raise ValueError(f"expected an (H, W, 3) uint8 array, got {arr.dtype} {arr.shape}")
+    return arr
+
+
+def open_image(path) -> np.ndarray:
+    """Decode a regular image file at full resolution (must fit in memory once)."""
+    with Image.open(path) as im:
+        return np.asarray(im.convert("RGB"))
+
+
+def tile_windows(height: int, width: int, tile: int = DEFAULT_TILE):
+    """Yield (y0, y1, x0, x1) windows covering the image in row-major order."""
+    for y0 in range(0, height, tile):
+        for x0 in range(0, width, tile):
+            yield y0, min(y0 + tile, height), x0, min(x0 + tile, width)
+
+
+def analyze_tiled(rgb: np.ndarray, tile: int = DEFAULT_TILE, workers: int = None,
+                  th: Thresholds = DEFAULT_THRESHOLDS) -> dict:
+    """Exact full-resolution analysis of an (H, W, 3) uint8 array, tile by tile."""
+    height, width = rgb.shape[:2]
+    workers = workers or os.cpu_count() or 1
+    counts = np.zeros(3, dtype=np.int64)
+    if use_lut(rgb[:tile, :tile]):
+        get_lut(th)   # load (or build) once, before the tile threads race for it
+    windows = tile_windows(height, width, tile)
+
+    def work(win):
+        y0, y1, x0, x1 = win
+        return classify_counts(rgb[y0:y1, x0:x1], th)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Bounded window of in-flight tiles keeps peak memory independent of image size.
+        max_in_flight = workers * 2
+        pending = set()
+        while True:
+            for win in windows:
+                pending.add(pool.submit(work, win))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                counts += fut.result()
+
+    R = result_from_counts(counts, height * width)
+    R.update(width=width, height=height, tile=tile)
+    return R
+
+
+def main(args) -> int:
+    if args.raw_shape or Path(args.path).suffix == ".npy":
+        rgb = open_memmap(args.path, args.raw_shape)
+    else:
+        # Orthomosaics legitimately exceed Pillow's decompression-bomb limit.
+        Image.MAX_IMAGE_PIXELS = None
+        rgb = open_image(args.path)
+    if args.estimate is not None:
+        R = estimate_array(rgb, precision=args.estimate, seed=args.seed)
+    else:
+        R = analyze_tiled(rgb, tile=args.tile, workers=args.workers)
+    json.dump({"file": str(args.path), **R}, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+def add_parser(sub):
+    p = sub.add_parser("tiles", help="full-resolution tiled analysis of one large image")
+    p.add_argument("path", help="image file, .npy array, or raw interleaved RGB (with --raw-shape)")
+    p.add_argument("--raw-shape", type=int, nargs=2, metavar=("HEIGHT", "WIDTH"),
+                   help="dimensions of a raw RGB file, which is memory-mapped")
+    p.add_argument("--tile", type=int, default=DEFAULT_TILE, help="tile edge in pixels")
+    p.add_argument("-j", "--workers", type=int, default=None, help="tile threads (default: all cores)")
+    p.add_argument("--estimate", type=float, metavar="POINTS",
+                   help="sample pixels until each percentage is within ±POINTS (95%% CI) "
+                        "instead of counting them all; adds <metric>_ci to the output")
+    p.add_argument("--seed", type=int, help="sampling seed for a reproducible --estimate")
+    p.set_defaults(func=main)
@@ -0,0 +1,208 @@
+"""
+ReefScan · Stage Timing
+=======================
+Opt-in wall-clock timers around the hot path: decode, resize, classify,
+chart rendering and report HTML. Each `with stage("name"):` block adds its
+duration to the process-wide aggregate and to the session aggregate bound
+to the current context, if there is one. Aggregates export as Prometheus
+text, either to a file or from a small HTTP endpoint.
+
+Timing is off unless REEFSCAN_TIMING=1, enable() was called or a Hold is
+alive (one per dashboard session that has the diagnostics panel open). While
+it is off, stage() is a single flag check that returns a shared no-op context
+manager.
+"""
+
+import contextlib
+import contextvars
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+
+ENV_ENABLED = os.environ.get("REEFSCAN_TIMING", "0") not in ("", "0")
+
+# Prometheus histogram bucket bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+_enabled = ENV_ENABLED
+_forced = ENV_ENABLED       # set by enable()
+_holds = 0                  # live Hold objects
+_holds_lock = threading.Lock()
+_NULL = contextlib.nullcontext()
+_session = contextvars.ContextVar("reefscan_timings", default=None)
+_collectors = []            # extra exposition lines, see add_collector()
+
+
+class Timings:
+    """Thread-safe per-stage aggregates: call count, total, max and bucket counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            st = self._stages.get(name)
+            if st is None:
+                st = self._stages[name] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+            st[0] += 1
+            st[1] += seconds
+            if seconds > st[2]:
+                st[2] = seconds
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le:
+                    st[3][i] += 1
+                    break
+
+    def snapshot(self) -> dict:
+        """{stage: (count, total_s, max_s, per-bucket counts)}, copied under the lock."""
+        with self._lock:
+            return {k: (c, t, m, list(b)) for k, (c, t, m, b) in self._stages.items()}
+
+    def rows(self) -> list:
+        """One display row per stage, slowest total first."""
+        return sorted(
+            ({"stage": k, "calls": c, "mean_ms": t / c * 1000, "max_ms": m * 1000,
+              "total_ms": t * 1000}
+             for k, (c, t, m, _) in self.snapshot().items()),
+            key=lambda r: -r["total_ms"],
+        )
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+PROCESS = Timings()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    """Turn timing on or off for the whole process (live Holds still keep it on)."""
+    global _forced, _enabled
+    with _holds_lock:
+        _forced = on
+        _enabled = _forced or _holds > 0
+
+
+def _add_hold(n: int):
+    global _holds, _enabled
+    with _holds_lock:
+        _holds += n
+        _enabled = _forced or _holds > 0
+
+
+class Hold:
+    """Keeps timing on while any Hold is alive; one user switching off doesn't stop another.
+
+    release() is idempotent and also runs when the Hold is garbage collected,
+    e.g. with the session state of a closed dashboard session.
+    """
+
+    def __init__(self):
+        _add_hold(1)
+        self._release = weakref.finalize(self, _add_hold, -1)
+
+    def release(self):
+        self._release()
+
+
+def bind(timings: Timings):
+    """Also record stages run in the current context into `timings`."""
+    _session.set(timings)
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        PROCESS.add(self.name, dt)
+        sink = _session.get()
+        if sink is not None:
+            sink.add(self.name, dt)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing one stage; a shared no-op while timing is off."""
+    if not _enabled:
+        return _NULL
+    return _Stage(name)
+
+
+# ── Prometheus export ─────────────────────────────────────────────────────────
+def add_collector(fn):
+    """Append the lines fn() returns (e.g. cache counters) to every export."""
+    _collectors.append(fn)
+
+
+def prometheus_text(timings: Timings = PROCESS) -> str:
+    """Text exposition format: a reefscan_stage_seconds histogram plus a max gauge,
+    then whatever the registered collectors add."""
+    snap = timings.snapshot()
+    lines = [
+        "# HELP reefscan_stage_seconds Wall-clock time per analysis/render stage.",
+        "# TYPE reefscan_stage_seconds histogram",
+    ]
+    for name, (count, total, _, buckets) in sorted(snap.items()):
+        cum = 0
+        for le, n in zip(BUCKETS, buckets):
+            cum += n
+            lines.append(f'reefscan_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cum}')
+        lines.append(f'reefscan_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+        lines.append(f'reefscan_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines.append(f'reefscan_stage_seconds_count{{stage="{name}"}} {count}')
+    lines += [
+        "# HELP reefscan_stage_max_seconds Slowest single call per stage since start.",
+        "# TYPE reefscan_stage_max_seconds gauge",
+    ]
+    for name, (_, _, mx, _) in sorted(snap.items()):
+        lines.append(f'reefscan_stage_max_seconds{{stage="{name}"}} {mx:.6f}')
+    for fn in _collectors:
+        lines += fn()
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, timings: Timings = PROCESS):
+    """Write the metrics atomically, e.g. for node_exporter's textfile collector."""
+    path = Path(path)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(prometheus_text(timings))
+    os.replace(tmp, path)
+
+
+def serve(port: int, host: str = "127.0.0.1"):
+    """Serve the process aggregate at http://host:port/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="reefscan-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,254 @@
+"""
+ReefScan · Vega-Lite Charts
+===========================
+Browser-rendered equivalents of the dashboard's matplotlib charts. Each
+function returns a Vega-Lite spec (a plain dict, a few KB of JSON) for
+st.vega_lite_chart, so the server does no rasterising and sends no PNGs.
+"""
+
+import math
+
+import numpy as np
+
+from reefscan.recovery import MONTHS, POINTS, SCENARIOS, months, recovery_bands
+from reefscan.theme import (
+    C_ALGAE,
+    C_AXIS,
+    C_BLEACH,
+    C_HEALTH,
+    C_LABEL,
+    C_MUTED,
+    C_SEDIMENT,
+    C_TITLE,
+    CHART_BG,
+    GAUGE_ZONES,
+)
+
+SERIES = [("bleach", "Bleaching", C_BLEACH), ("algae", "Algae", C_ALGAE),
+          ("sediment", "Sediment", C_SEDIMENT), ("health", "Health", C_HEALTH)]
+
+CONFIG = {
+    "background": CHART_BG,
+    "view": {"stroke": None},
+    "font": "Inter, sans-serif",
+    "title": {"color": C_TITLE, "fontSize": 14, "anchor": "start", "offset": 14},
+    "axis": {"labelColor": C_LABEL, "titleColor": C_AXIS, "domain": False,
+             "tickColor": C_AXIS, "gridColor": "#FFFFFF", "gridOpacity": 0.04,
+             "gridDash": [3, 3], "labelFontSize": 11, "titleFontWeight": "normal"},
+    "legend": {"labelColor": C_MUTED, "orient": "bottom", "title": None},
+}
+
+
+def _spec(**kw) -> dict:
+    return {"$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+            "config": CONFIG, "padding": 12, **kw}
+
+
+def _title(text: str) -> dict:
+    return {"text": text, "fontWeight": "bold"}
+
+
+def bar_spec(R: dict) -> dict:
+    """Vertical bar chart -- pollution & health breakdown."""
+    labels = ["Coral Bleaching", "Algae Bloom", "Sediment", "Marine Health"]
+    values = [{"label": lbl, "value": float(R[k]), "color": col}
+              for lbl, (k, _, col) in zip(labels, SERIES)]
+    x = {"field": "label", "type": "nominal", "sort": None, "title": None,
+         "axis": {"labelAngle": 0, "labelFontWeight": 600}}
+    y = {"field": "value", "type": "quantitative", "scale": {"domain": [0, 118]},
+         "title": "Coverage  (%)", "axis": {"tickCount": 6}}
+    return _spec(
+        title=_title("Pollution & Health Coverage Analysis"),
+        height=300,
+        data={"values": values},
+        encoding={"x": x},
+        layer=[
+            {"mark": {"type": "bar", "color": "#FFFFFF", "opacity": 0.04, "width": {"band": 0.52}},
+             "encoding": {"y": {"datum": 100, "type": "quantitative", "scale": y["scale"]}}},
+            {"mark": {"type": "bar", "opacity": 0.9, "width": {"band": 0.52},
+                      "cornerRadiusTopLeft": 3, "cornerRadiusTopRight": 3},
+             "encoding": {"y": y, "color": {"field": "color", "type": "nominal", "scale": None}}},
+            {"mark": {"type": "text", "dy": -10, "fontWeight": 700, "font": "monospace", "fontSize": 12},
+             "encoding": {"y": y, "text": {"field": "value", "format": ".2f"},
+                          "color": {"field": "color", "type": "nominal", "scale": None}}},
+        ],
+    )
+
+
+def donut_spec(R: dict) -> dict:
+    """Donut chart — ecosystem composition breakdown."""
+    values = [{"label": lbl if k != "health" else "Healthy Water",
+               "value": max(float(R[k]), 0.01)} for k, lbl, _ in SERIES]
+    colour = {"field": "label", "type": "nominal", "sort": None,
+              "scale": {"domain": [v["label"] for v in values], "range": [c for *_, c in SERIES]}}
+    return _spec(
+        title=_title("Ecosystem Composition"),
+        height=320,
+        data={"values": values},
+        layer=[
+            {"mark": {"type": "arc", "innerRadius": 62, "outerRadius": 120,
+                      "stroke": CHART_BG, "strokeWidth": 2.5},
+             "encoding": {"theta": {"field": "value", "type": "quantitative", "stack": True},
+                          "color": colour, "order": {"field": "value", "sort": None}}},
+            {"mark": {"type": "text", "text": f"{R['health']:.1f}%", "fontSize": 26, "fontWeight": 800,
+                      "font": "monospace", "color": C_HEALTH, "dy": -6}},
+            {"mark": {"type": "text", "text": "HEALTH INDEX", "fontSize": 9,
+                      "font": "monospace", "color": C_AXIS, "dy": 16}},
+        ],
+    )
+
+
+def gauge_spec(R: dict) -> dict:
+    """Semi-circular health gauge — Critical / Poor / Fair / Good."""
+    score = float(R["health"])
+    # Vega-Lite arcs: theta 0 is 12 o'clock, clockwise; the gauge spans -90° .. +90°.
+    ang = lambda pct: math.radians(-90 + 180 * pct / 100)   # noqa: E731
+    zones = [{"t0": ang(a), "t1": ang(b), "color": col, "label": lbl,
+              "tm": ang((a + b) / 2), "rot": -90 + 180 * (a + b) / 200}
+             for a, b, col, lbl in GAUGE_ZONES]
+    ticks = [{"t": ang(p), "label": str(p)} for p in (0, 25, 50, 75, 100)]
+    needle = ang(score)
+    centre = {"x": {"expr": "width / 2"}, "y": {"expr": "height * 0.78"}}
+    theta = lambda f: {"field": f, "type": "quantitative", "scale": None}   # noqa: E731
+    return _spec(
+        title=_title("Health Gauge"),
+        height=250,
+        layer=[
+            {"data": {"values": zones},
+             "mark": {"type": "arc", "radius": 130, "radius2": 78, "opacity": 0.88,
+                      "padAngle": 0.02, **centre},
+             "encoding": {"theta": theta("t0"), "theta2": theta("t1"),
+                          "color": {"field": "color", "type": "nominal", "scale": None}}},
+            {"data": {"values": zones},
+             "mark": {"type": "text", "radius": 104, "fontSize": 9, "fontWeight": "bold",
+                      "color": "white", **centre},
+             "encoding": {"theta": theta("tm"), "text": {"field": "label"},
+                          "angle": {"field": "rot", "type": "quantitative", "scale": None}}},
+            {"data": {"values": ticks},
+             "mark": {"type": "text", "radius": 148, "fontSize": 9, "font": "monospace",
+                      "color": C_AXIS, **centre},
+             "encoding": {"theta": theta("t"), "text": {"field": "label"}}},
+            {"data": {"values": [{}]},
+             "mark": {"type": "arc", "radius": 104, "radius2": 0, "color": "#FFFFFF",
+                      "theta": needle - 0.025, "theta2": needle + 0.025, **centre}},
+            {"data": {"values": [{}]},
+             "mark": {"type": "arc", "radius": 9, "theta": 0, "theta2": 2 * math.pi,
+                      "color": C_HEALTH, **centre}},
+            {"data": {"values": [{}]},
+             "mark": {"type": "text", "text": f"{score:.1f}%", "fontSize": 24, "fontWeight": 800,
+                      "font": "monospace", "color": C_HEALTH,
+                      "x": centre["x"], "y": {"expr": "height * 0.78 - 44"}}},
+            {"data": {"values": [{}]},
+             "mark": {"type": "text", "text": "Marine Health Score", "fontSize": 9,
+                      "font": "monospace", "color": C_AXIS,
+                      "x": centre["x"], "y": {"expr": "height * 0.78 - 22"}}},
+        ],
+    )
+
+
+def recovery_spec(R: dict, points: int = POINTS) -> dict:
+    """Marine Recovery Simulation — median logistic curves with Monte-Carlo bands."""
+    t = np.round(months(points), 2).tolist()
+    # One row per series with the percentile curves as arrays; flattened in the
+    # browser, which keeps the spec a few KB instead of one JSON object per point.
+    rows, domain, colours = [], [], []
+    for name, yb, yi, cb, ci in recovery_bands(R["health"], points):
+        for label, q, col, improved in ((f"{name} — Baseline", yb, cb, False),
+                                        (f"{name} — Improved", yi, ci, True)):
+            domain.append(label)
+            colours.append(col)
+            rows.append({"series": label, "improved": improved, "month": t,
+                         **{f: np.round(q[i], 3).tolist()
+                            for i, f in enumerate(("p10", "p25", "p50", "p75", "p90"))}})
+    x = {"field": "month", "type": "quantitative", "title": "Time (Months)",
+         "scale": {"domain": [0, MONTHS]}}
+    y = {"type": "quantitative", "title": "Recovery Level", "scale": {"domain": [0, 1.1]}}
+    colour = {"field": "series", "type": "nominal",
+              "scale": {"domain": domain, "range": colours},
+              # shared by the band and line layers; draw line swatches, not faint areas
+              "legend": {"columns": 2, "symbolType": "stroke", "symbolOpacity": 1,
+                         "symbolStrokeWidth": 2.5}}
+    band = lambda lo, hi, opacity: {                                    # noqa: E731
+        "mark": {"type": "area", "interpolate": "monotone", "opacity": opacity},
+        "encoding": {"x": x, "y": {**y, "field": lo}, "y2": {"field": hi},
+                     "color": colour}}
+    return _spec(
+        title=_title(f"Marine Recovery Simulation  ·  Boost: {R['health']:.0f}%  "
+                     f"·  {SCENARIOS:,} scenarios"),
+        height=320,
+        data={"values": rows},
+        transform=[{"flatten": ["month", "p10", "p25", "p50", "p75", "p90"]}],
+        layer=[
+            band("p10", "p90", 0.08),
+            band("p25", "p75", 0.16),
+            {"mark": {"type": "line", "interpolate": "monotone"},
+             "encoding": {
+                 "x": x,
+                 "y": {**y, "field": "p50"},
+                 "color": colour,
+                 "strokeDash": {"field": "improved", "type": "nominal", "legend": None,
+                                "scale": {"domain": [False, True], "range": [[6, 4], [1, 0]]}},
+                 "strokeWidth": {"field": "improved", "type": "nominal", "legend": None,
+                                 "scale": {"domain": [False, True], "range": [1.8, 2.5]}},
+             }},
+            {"mark": {"type": "rule", "color": "#26354A", "strokeDash": [2, 2]},
+             "encoding": {"y": {"datum": 1.0}}},
+            {"mark": {"type": "text", "text": "Full Recovery", "align": "right", "dy": -8,
+                      "font": "monospace", "fontSize": 10, "color": C_AXIS},
+             "encoding": {"x": {"datum": MONTHS - 1}, "y": {"datum": 1.0}}},
+        ],
+    )
+
+
+def compare_spec(results: list) -> dict:
+    """Grouped bar chart -- every metric for every uploaded image side by side."""
+    rows = [{"image": name[:15], "metric": lbl, "value": float(R[k])}
+            for name, R in results for k, lbl, _ in SERIES]
+    colour = {"field": "metric", "type": "nominal", "sort": None,
+              "scale": {"domain": [m[1] for m in SERIES], "range": [m[2] for m in SERIES]}}
+    y = {"field": "value", "type": "quantitative", "scale": {"domain": [0, 118]},
+         "title": "Coverage (%)"}
+    enc = {"x": {"field": "image", "type": "nominal", "sort": None, "title": None,
+                 "axis": {"labelAngle": 0, "labelFontWeight": 600}},
+           "xOffset": {"field": "metric", "type": "nominal", "sort": None},
+           "y": y}
+    return _spec(
+        title=_title("All Images — Metric Comparison"),
+        height=300,
+        data={"values": rows},
+        encoding=enc,
+        layer=[
+            {"mark": {"type": "bar", "opacity": 0.9}, "encoding": {"color": colour}},
+            {"mark": {"type": "text", "dy": -8, "fontSize": 10, "fontWeight": 700, "font": "monospace"},
+             "encoding": {"text": {"field": "value", "format": ".1f"}, "color": colour}},
+        ],
+    )
+
+
+def distribution_spec(summary: dict) -> dict:
+    """Per-metric histograms of a survey (report.survey_summary), one small multiple each."""
+    edges = summary["edges"]
+    rows = [{"metric": lbl, "lo": edges[i], "hi": edges[i + 1], "count": c, "color": col}
+            for k, lbl, col in SERIES for i, c in enumerate(summary["hist"][k])]
+    return _spec(
+        title=_title(f"Survey Distribution — {summary['n']} images"),
+        data={"values": rows},
+        columns=4,
+        facet={"field": "metric", "type": "nominal", "sort": [m[1] for m in SERIES],
+               "title": None, "header": {"labelColor": C_LABEL, "labelFontWeight": 600,
+                                         "labelFontSize": 12}},
+        spec={
+            "width": 170, "height": 150,
+            "mark": {"type": "bar", "opacity": 0.9, "binSpacing": 1},
+            "encoding": {
+                "x": {"field": "lo", "type": "quantitative", "bin": {"binned": True, "step": 5},
+                      "scale": {"domain": [0, 100]}, "title": "Coverage (%)"},
+                "x2": {"field": "hi"},
+                "y": {"field": "count", "type": "quantitative", "title": "Images"},
+                "color": {"field": "color", "type": "nominal", "scale": None},
+                "tooltip": [{"field": "metric"}, {"field": "lo", "title": "from %"},
+                            {"field": "hi", "title": "to %"}, {"field": "count"}],
+            },
+        },
+        resolve={"scale": {"y": "independent"}},
+    )
@@ -0,0 +1,170 @@
+"""
+ReefScan · Video Analysis
+=========================
+Runs the classifier over sampled frames of a transect video. A reader thread
+decodes frames with cv2.VideoCapture into a bounded queue while worker threads
+classify them, so decoding and analysis overlap. Classified frames go back to
+the reader as spare buffers to decode into, so a long transect reuses the same
+few frame arrays. Rows come out in timestamp order with rolling means over the
+last `window` samples.
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from reefscan.batch import open_output
+from reefscan.engine import DEFAULT_THRESHOLDS, METRICS, Thresholds, analyze_bgr
+
+FIELDS = ["frame", "t", *METRICS, *(f"{k}_roll" for k in METRICS)]
+
+
+def _read_frames(cap, stride: int, frames: queue.Queue, spare: queue.SimpleQueue,
+                 n_workers: int, stop: threading.Event):
+    """Producer: push (sample_no, frame_no, t, frame) for every stride-th frame."""
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_no = sample_no = 0
+    try:
+        while not stop.is_set():
+            if frame_no % stride:
+                # grab() skips the colour conversion/copy of frames we don't sample
+                if not cap.grab():
+                    break
+            else:
+                try:
+                    buf = spare.get_nowait()
+                except queue.Empty:
+                    buf = None   # pool still filling up: let read() allocate
+                ok, frame = cap.read(buf)
+                if not ok:
+                    break
+                t = frame_no / fps if fps else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                frames.put((sample_no, frame_no, t, frame))
+                sample_no += 1
+            frame_no += 1
+    finally:
+        for _ in range(n_workers):
+            frames.put(None)
+
+
+def _classify_frames(frames: queue.Queue, results: queue.Queue, spare: queue.SimpleQueue,
+                     th: Thresholds):
+    """Consumer: classify frames until the producer's sentinel arrives.
+
+    Always ends with a None sentinel on `results`, preceded by the exception
+    if classification failed, so the caller neither hangs nor loses the error.
+    """
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                return
+            sample_no, frame_no, t, frame = item
+            R = analyze_bgr(frame, th)
+            spare.put(frame)
+            results.put((sample_no, {"frame": frame_no, "t": round(t, 3),
+                                     **{k: float(v) for k, v in R.items()}}))
+    except Exception as exc:
+        results.put(exc)
+    finally:
+        results.put(None)
+
+
+def analyze_video(path, stride: int = None, every: float = None, workers: int = None,
+                  window: int = 30, queue_size: int = None, th: Thresholds = DEFAULT_THRESHOLDS):
+    """Yield one row per sampled frame, in order, with rolling means over `window` samples.
+
+    Sample every `stride`-th frame, or one frame per `every` seconds (converted to a
+    stride from the container's frame rate). The frame queue holds at most
+    `queue_size` decoded frames, which bounds memory for 4K footage.
+    """
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise OSError(f"cannot open video {path}")
+    if stride is None:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        stride = max(1, round((every or 1.0) * fps))
+    workers = workers or os.cpu_count() or 1
+    frames = queue.Queue(maxsize=queue_size or workers * 2)
+    results = queue.Queue()
+    spare = queue.SimpleQueue()
+    stop = threading.Event()
+
+    threads = [threading.Thread(target=_read_frames, daemon=True,
+                                args=(cap, stride, frames, spare, workers, stop))]
+    threads += [threading.Thread(target=_classify_frames, daemon=True,
+                                 args=(frames, results, spare, th)) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    pending, next_no, live = {}, 0, workers
+    recent = deque(maxlen=window)
+    try:
+        while live:
+            item = results.get()
+            if item is None:
+                live -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            pending[item[0]] = item[1]
+            # Workers finish out of order; release rows strictly by sample number.
+            while next_no in pending:
+                row = pending.pop(next_no)
+                recent.append(row)
+                for k in METRICS:
+                    row[f"{k}_roll"] = round(sum(r[k] for r in recent) / len(recent), 2)
+                yield row
+                next_no += 1
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue so it can see `stop`.
+        while threads[0].is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                time.sleep(0.01)
+        # The drain may have eaten the producer's sentinels: post one per worker
+        # still running, and wait for every thread before releasing the capture.
+        for t in threads[1:]:
+            while t.is_alive():
+                try:
+                    frames.put_nowait(None)
+                except queue.Full:
+                    pass
+                t.join(0.01)
+        cap.release()
+
+
+def main(args) -> int:
+    t0 = time.perf_counter()
+    n, last_t = 0, 0.0
+    with open_output(args.output, args.format, FIELDS) as writer:
+        for row in analyze_video(args.path, stride=args.stride, every=args.every,
+                                 workers=args.workers, window=args.window):
+            writer.write(row)
+            n, last_t = n + 1, row["t"]
+
+    elapsed = time.perf_counter() - t0
+    print(f"{n} frames sampled over {last_t:.1f} s of video in {elapsed:.2f} s "
+          f"· {n / elapsed if elapsed else 0:.1f} frames/s "
+          f"· {last_t / elapsed if elapsed else 0:.1f}x real time", file=sys.stderr)
+    return 0 if n else 1
+
+
+def add_parser(sub):
+    p = sub.add_parser("video", help="health time series for a transect video")
+    p.add_argument("path", help="video file (anything cv2.VideoCapture can open)")
+    g = p.add_mutually_exclusive_group()
+    g.add_argument("--stride", type=int, help="analyse every N-th frame")
+    g.add_argument("--every", type=float, help="analyse one frame per N seconds (default 1.0)")
+    p.add_argument("--window", type=int, default=30, help="rolling-mean window, in samples")
+    p.add_argument("-o", "--output", default="-", help="CSV/JSONL output path, '-' for stdout")
+    p.add_argument("--format", choices=["csv", "jsonl"], help="default: from output suffix, else csv")
+    p.add_argument("-j", "--workers", type=int, default=None, help="classifier threads (default: all cores)")
+    p.set_defaults(func=main)
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep LUTs and other caches out of the user's ~/.cache."""
+    monkeypatch.setenv("REEFSCAN_CACHE_DIR", str(tmp_path / "cache"))
+
+
+@pytest.fixture(scope="session")
+def colour_cube() -> np.ndarray:
+    """Every 24-bit colour once, as a 4096 x 4096 RGB image."""
+    v = np.arange(1 << 24, dtype=np.uint32)
+    return np.stack([v & 255, v >> 8 & 255, v >> 16], axis=-1).astype(np.uint8).reshape(4096, 4096, 3)
@@ -0,0 +1,66 @@
+"""Batch rows: one per file, failures recorded rather than raised, store hits not decoded."""
+
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from benchmarks.synth import reef_image
+from reefscan.batch import RowWriter, analyze_chunk, find_images, run_batch
+from reefscan.engine import METRICS, analyze_array, content_hash, decode_reduced
+from reefscan.store import ResultStore
+
+
+@pytest.fixture
+def survey(tmp_path):
+    root = tmp_path / "survey"
+    (root / "transect").mkdir(parents=True)
+    for i, name in enumerate(["a.jpg", "transect/b.png", "transect/c.jpg"]):
+        Image.fromarray(reef_image(320, 240, seed=i)).save(root / name)
+    (root / "notes.txt").write_text("not an image")
+    (root / "bad.jpg").write_bytes(b"not a jpeg")
+    return root
+
+
+def test_find_images_is_recursive_and_sorted(survey):
+    assert [p.relative_to(survey).as_posix() for p in find_images(survey)] == \
+        ["a.jpg", "bad.jpg", "transect/b.png", "transect/c.jpg"]
+
+
+def test_rows_match_the_engine(survey):
+    path = survey / "a.jpg"
+    (row,) = analyze_chunk([path])
+    data = path.read_bytes()
+    R = analyze_array(decode_reduced(io.BytesIO(data)).rgb)
+    assert row["hash"] == content_hash(data) and row["bytes"] == len(data)
+    assert (row["width"], row["height"]) == (320, 240)
+    assert {k: row[k] for k in METRICS} == {k: float(R[k]) for k in METRICS}
+
+
+def test_unreadable_files_become_error_rows(survey):
+    bad, missing = analyze_chunk([survey / "bad.jpg", survey / "gone.jpg"])
+    assert "error" in bad and bad["bytes"] == len(b"not a jpeg")
+    assert missing["error"].startswith("FileNotFoundError") and missing["bytes"] is None
+
+
+def test_stored_images_are_not_decoded(survey, tmp_path):
+    path = survey / "a.jpg"
+    db = tmp_path / "results.sqlite"
+    with ResultStore(db) as store:
+        store.add(content_hash(path.read_bytes()), dict.fromkeys(METRICS, 12.5),
+                  width=320, height=240)
+    (row,) = analyze_chunk([path], db=str(db))
+    assert row["stored"] is True and "decode_ms" not in row
+    assert {k: row[k] for k in METRICS} == dict.fromkeys(METRICS, 12.5)
+
+
+def test_run_batch_streams_every_row(survey, tmp_path):
+    out = io.StringIO()
+    with ResultStore(tmp_path / "results.sqlite") as store:
+        summary = run_batch(find_images(survey), RowWriter(out, "jsonl"), workers=2,
+                            store=store, site="north")
+        assert store.count() == 3
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert sorted(r["file"] for r in rows) == sorted(str(p) for p in find_images(survey))
+    assert (summary["images"], summary["errors"], summary["stored"]) == (4, 1, 0)
@@ -0,0 +1,36 @@
+"""The benchmark suite is deterministic and its JSON round-trips through --compare."""
+
+import json
+
+import numpy as np
+
+from benchmarks import run
+from benchmarks.synth import reef_image
+
+
+def test_fixtures_are_deterministic():
+    np.testing.assert_array_equal(reef_image(320, 240, seed=1), reef_image(320, 240, seed=1))
+    assert not np.array_equal(reef_image(320, 240, seed=1), reef_image(320, 240, seed=2))
+    assert run.fixture("vga", "JPEG") == run.fixture("vga", "JPEG")   # second one from disk
+
+
+def test_timeit_respects_run_bounds():
+    calls = []
+    res = run.timeit(lambda: calls.append(1), min_runs=3, min_time=0, max_runs=5)
+    assert res["n"] == len(calls) == 3
+    assert run.timeit(lambda: None, min_runs=1, min_time=10, max_runs=4)["n"] == 4
+    assert res["min_ms"] <= res["median_ms"]
+
+
+def test_results_json_compares_against_itself(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    argv = ["--only", "decode", "--sizes", "vga", "--formats", "JPEG", "-o", str(out)]
+    assert run.main(argv) == 0
+    doc = json.loads(out.read_text())
+    names = {r["name"] for r in doc["results"]}
+    assert names == {"decode_reduced", "decode_path", "analyze_thumbnail"}
+    assert all(r["size"] == "vga" and r["format"] == "JPEG" for r in doc["results"])
+    capsys.readouterr()
+    run.compare(out, doc["results"])
+    rows = [line for line in capsys.readouterr().out.splitlines() if line.endswith("x")]
+    assert len(rows) == 3 and all(line.split()[-1] == "1.00x" for line in rows)
@@ -0,0 +1,65 @@
+"""The fast classification paths give exactly the numbers of the reference rules."""
+
+import numpy as np
+import pytest
+
+from benchmarks.synth import reef_image
+from reefscan.engine import (
+    DEFAULT_THRESHOLDS,
+    Thresholds,
+    analyze_array,
+    class_codes,
+    classify_counts,
+    score_hist,
+    thresholds_from_fractions,
+)
+from reefscan.tiles import analyze_tiled
+
+THRESHOLDS = [DEFAULT_THRESHOLDS, Thresholds(200, 100, 150, 90)]
+
+
+def reference_codes(rgb: np.ndarray, fractions=(0.8, 0.45, 0.4, 0.3)) -> np.ndarray:
+    """The original notebook's float rules on rgb / 255, packed like class_codes."""
+    img = rgb / 255.0
+    r, g, b = img[..., 0], img[..., 1], img[..., 2]
+    bleach, algae, sed_r, sed_b = fractions
+    return ((r > bleach) & (g > bleach) & (b > bleach)
+            | ((g > algae) & (g > r)) << 1
+            | ((r > sed_r) & (b < sed_b)) << 2).astype(np.uint8)
+
+
+def test_integer_cutoffs_match_float_rules(colour_cube):
+    th = thresholds_from_fractions(0.8, 0.45, 0.4, 0.3)
+    assert th == DEFAULT_THRESHOLDS
+    for plane in colour_cube.reshape(256, 256 * 256, 3):     # one blue value per plane
+        np.testing.assert_array_equal(class_codes(plane[None], th)[0], reference_codes(plane))
+
+
+@pytest.mark.parametrize("th", THRESHOLDS)
+def test_lut_matches_fused_over_colour_cube(colour_cube, th):
+    assert classify_counts(colour_cube, th, lut=True) == classify_counts(colour_cube, th, lut=False)
+
+
+@pytest.mark.parametrize("view", [
+    np.s_[:1, :1], np.s_[:3, :4001], np.s_[5:9, 100:103], np.s_[::-1, 17:3000], np.s_[:, ::7],
+])
+def test_lut_matches_fused_on_views(colour_cube, view):
+    rgb = colour_cube[view]
+    assert classify_counts(rgb, lut=True) == classify_counts(rgb, lut=False)
+
+
+def test_tiled_matches_single_pass():
+    rgb = np.ascontiguousarray(reef_image(1500, 1100, seed=3))
+    whole = classify_counts(rgb, lut=False)
+    R = analyze_tiled(rgb, tile=512, workers=2)
+    total = rgb.shape[0] * rgb.shape[1]
+    for key, n in zip(("bleach", "algae", "sediment"), whole):
+        assert R[key] == round(n / total * 100, 2)
+
+
+@pytest.mark.parametrize("th", THRESHOLDS)
+def test_8_bit_histogram_rescores_exactly(th):
+    rgb = reef_image(800, 600, seed=1)
+    R, hist = analyze_array(rgb, hist_bits=8)
+    assert score_hist(hist) == R
+    assert score_hist(hist, th) == analyze_array(rgb, th)
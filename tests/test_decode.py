@@ -0,0 +1,28 @@
+"""pixels_into matches Pillow's public array export, with and without the raw encoder."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.synth import reef_image
+from reefscan import engine
+from reefscan.engine import pixels_into
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L", "P", "I;16"])
+def test_pixels_into_matches_asarray(mode):
+    im = Image.fromarray(reef_image(301, 203, seed=2)).convert(mode)
+    expected = np.asarray(im.convert("RGB"))
+    np.testing.assert_array_equal(pixels_into(im), expected)
+    out = np.empty_like(expected)
+    assert pixels_into(im, out) is out
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_pixels_into_without_raw_encoder(monkeypatch):
+    def changed_api(im, flat):
+        raise AttributeError("module 'PIL.Image' has no attribute '_getencoder'")
+
+    im = Image.fromarray(reef_image(301, 203, seed=2))
+    monkeypatch.setattr(engine, "_encode_into", changed_api)
+    np.testing.assert_array_equal(pixels_into(im), np.asarray(im))
@@ -0,0 +1,9 @@
+"""The headless package imports within budget and without UI modules (benchmarks/import_budget.py)."""
+
+from benchmarks import import_budget
+
+
+def test_import_budget():
+    res = import_budget.measure(runs=3)
+    assert res["forbidden"] == []
+    assert res["best"] <= 0.5
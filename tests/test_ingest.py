@@ -0,0 +1,57 @@
+"""IngestPool: one job per content hash, forgotten once done, no self-deadlock."""
+
+import threading
+from concurrent.futures import Future
+
+from reefscan.ingest import IngestPool
+
+
+class DoneExecutor:
+    """Stands in for the thread pool: every job has finished before submit returns."""
+
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def submit_in_thread(pool, *args):
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("job", pool.submit(*args)), daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert not t.is_alive(), "submit deadlocked"
+    return out["job"]
+
+
+def test_already_completed_job_does_not_deadlock():
+    pool = IngestPool(1)
+    pool._pool = DoneExecutor()
+    job = submit_in_thread(pool, "a", lambda: 42)
+    assert job.result() == 42
+    assert pool.pending("a") is None
+    # the lock was released: later submits (other sessions) still go through
+    assert submit_in_thread(pool, "b", lambda: 7).result() == 7
+
+
+def test_one_job_per_hash_while_running():
+    pool = IngestPool(2)
+    release = threading.Event()
+    calls = []
+
+    def work(x):
+        calls.append(x)
+        release.wait(5)
+        return x
+
+    first = pool.submit("h", work, 1)
+    second = pool.submit("h", work, 2)
+    assert second is first and pool.pending("h") is first
+    release.set()
+    assert first.result(timeout=5) == 1
+    pool.shutdown()
+    assert calls == [1]
+    assert pool.pending("h") is None
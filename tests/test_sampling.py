@@ -0,0 +1,45 @@
+"""estimate_array: intervals as narrow as asked that cover the exact full-resolution count."""
+
+import numpy as np
+import pytest
+
+from benchmarks.synth import reef_image
+from reefscan.engine import METRICS, classify_counts, result_from_counts
+from reefscan.sampling import MAX_FRACTION, estimate_array
+
+
+def exact(rgb: np.ndarray) -> dict:
+    return result_from_counts(classify_counts(rgb), rgb.shape[0] * rgb.shape[1])
+
+
+@pytest.fixture(scope="module")
+def survey_frame():
+    return reef_image(3000, 2000, seed=3)
+
+
+def test_intervals_cover_the_exact_count(survey_frame):
+    truth = exact(survey_frame)
+    runs = [estimate_array(survey_frame, seed=s) for s in range(100)]
+    for m in METRICS:
+        # 95% intervals; results and half-widths are rounded to 0.01
+        covered = sum(abs(e[m] - truth[m]) <= e[f"{m}_ci"] + 0.01 for e in runs)
+        assert covered >= 85, (m, covered)
+
+
+@pytest.mark.parametrize("precision", [0.5, 1.0, 2.0])
+def test_stops_at_the_requested_precision(survey_frame, precision):
+    e = estimate_array(survey_frame, precision=precision, seed=7)
+    assert max(e[f"{m}_ci"] for m in METRICS) <= precision
+    assert 0 < e["sampled"] <= MAX_FRACTION * survey_frame.shape[0] * survey_frame.shape[1]
+
+
+def test_seed_makes_it_reproducible(survey_frame):
+    assert estimate_array(survey_frame, seed=11) == estimate_array(survey_frame, seed=11)
+
+
+def test_unreachable_precision_counts_everything():
+    rgb = reef_image(120, 90, seed=4)
+    e = estimate_array(rgb, precision=0.1, seed=0)
+    assert e["sampled"] == 120 * 90
+    assert {m: e[m] for m in METRICS} == exact(rgb)
+    assert all(e[f"{m}_ci"] == 0.0 for m in METRICS)
@@ -0,0 +1,62 @@
+"""ResultStore: one row per (image, thresholds, analysis size), merged on re-analysis."""
+
+import pytest
+
+from reefscan import store as store_mod
+from reefscan.engine import METRICS, Thresholds
+from reefscan.store import ResultStore, threshold_key
+
+OTHER = Thresholds(200, 100, 150, 90)
+
+
+def R(v: float) -> dict:
+    return dict.fromkeys(METRICS, v)
+
+
+@pytest.fixture
+def db(tmp_path):
+    with ResultStore(tmp_path / "results.sqlite") as s:
+        yield s
+
+
+def test_reanalysis_keeps_metadata_and_refreshes_results(db):
+    db.add("h1", R(10), file="first.jpg", site="north", width=640)
+    db.flush()
+    db.add("h1", R(20), file="renamed.jpg", site="south", captured="2024-03-01T10:00:00", height=480)
+    assert db.count() == 1
+    (row,) = db.query()
+    assert (row["file"], row["site"], row["width"]) == ("first.jpg", "north", 640)   # first seen
+    assert (row["captured"], row["height"]) == ("2024-03-01T10:00:00", 480)          # gaps filled
+    assert row["health"] == 20.0                                                     # refreshed
+
+
+def test_key_includes_thresholds_and_analysis_size(db, monkeypatch):
+    db.add("h1", R(10))
+    db.add("h1", R(30), OTHER)
+    assert db.get("h1")["algae"] == 10.0 and db.get("h1", OTHER)["algae"] == 30.0
+    assert db.count() == 2
+    before = threshold_key()
+    monkeypatch.setattr(store_mod, "RESIZE_TO", (640, 640))   # a different analysis size
+    assert threshold_key() != before
+    assert db.get("h1") is None
+
+
+def test_pending_rows_are_readable_and_flushed_in_batches(tmp_path):
+    with ResultStore(tmp_path / "r.sqlite", flush_every=3) as s:
+        s.add("a", R(1))
+        assert s.get_many(["a", "b"]) == {"a": R(1.0)}
+        s.add("b", R(2))
+        s.add("c", R(3))           # third row triggers the flush
+        assert s._pending == []
+        with ResultStore(s.path, readonly=True) as reader:
+            assert set(reader.get_many(["a", "b", "c", "d"])) == {"a", "b", "c"}
+
+
+def test_query_filters_by_site_and_capture_time(db):
+    for h, site, captured in [("a", "north", "2024-01-05"), ("b", "north", "2023-12-30"),
+                              ("c", "south", "2024-02-01"), ("d", "north", "2024-03-01")]:
+        db.add(h, R(5), site=site, captured=captured)
+    rows = db.query(site="north", since="2024-01-01", until="2024-03-01")
+    assert [r["hash"] for r in rows] == ["a"]
+    assert [r["hash"] for r in db.query(site="north")] == ["b", "a", "d"]
+    assert len(db.query(limit=2)) == 2
@@ -0,0 +1,61 @@
+"""Tiled analysis is exact whatever the tiling, and memory-mapped inputs read the same pixels."""
+
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks.synth import reef_image
+from reefscan.__main__ import main as cli
+from reefscan.engine import classify_counts, result_from_counts
+from reefscan.tiles import analyze_tiled, open_memmap, tile_windows
+
+
+@pytest.fixture(scope="module")
+def mosaic():
+    return reef_image(1001, 777, seed=5)
+
+
+def test_windows_cover_every_pixel_once():
+    seen = np.zeros((777, 1001), dtype=np.int64)
+    for y0, y1, x0, x1 in tile_windows(777, 1001, tile=256):
+        seen[y0:y1, x0:x1] += 1
+    assert (seen == 1).all()
+
+
+@pytest.mark.parametrize("tile, workers", [(64, 1), (300, 3), (4096, 2)])
+def test_result_does_not_depend_on_tiling(mosaic, tile, workers):
+    R = analyze_tiled(mosaic, tile=tile, workers=workers)
+    expected = result_from_counts(classify_counts(mosaic), mosaic.shape[0] * mosaic.shape[1])
+    assert {k: R[k] for k in expected} == expected
+    assert (R["width"], R["height"], R["tile"]) == (1001, 777, tile)
+
+
+def test_memory_mapped_inputs(mosaic, tmp_path):
+    np.save(tmp_path / "m.npy", mosaic)
+    mosaic.tofile(tmp_path / "m.rgb")
+    npy = open_memmap(tmp_path / "m.npy")
+    raw = open_memmap(tmp_path / "m.rgb", shape=(777, 1001))
+    np.testing.assert_array_equal(npy, mosaic)
+    np.testing.assert_array_equal(raw, mosaic)
+    assert analyze_tiled(raw, tile=256) == analyze_tiled(mosaic, tile=256)
+
+
+def test_memmap_rejects_bad_input(tmp_path):
+    np.save(tmp_path / "grey.npy", np.zeros((4, 4), dtype=np.uint8))
+    (tmp_path / "m.rgb").write_bytes(bytes(48))
+    with pytest.raises(ValueError):
+        open_memmap(tmp_path / "grey.npy")
+    with pytest.raises(ValueError):
+        open_memmap(tmp_path / "m.rgb")
+
+
+def test_cli_exact_and_estimate(mosaic, tmp_path, capsys):
+    np.save(tmp_path / "m.npy", mosaic)
+    assert cli(["tiles", str(tmp_path / "m.npy"), "--tile", "300"]) == 0
+    exact = json.loads(capsys.readouterr().out)
+    assert exact["algae"] == analyze_tiled(mosaic)["algae"]
+    assert cli(["tiles", str(tmp_path / "m.npy"), "--estimate", "2", "--seed", "1"]) == 0
+    est = json.loads(capsys.readouterr().out)
+    assert 0 <= est["algae_ci"] <= 2
+    assert abs(est["algae"] - exact["algae"]) <= 3 * est["algae_ci"] + 0.01
@@ -0,0 +1,59 @@
+"""analyze_video yields rows in frame order, matching a sequential pass, and cleans up."""
+
+import threading
+import time
+
+import cv2
+import pytest
+
+from benchmarks.synth import reef_image
+from reefscan.engine import METRICS, analyze_bgr
+from reefscan import video
+from reefscan.video import analyze_video
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    path = tmp_path_factory.mktemp("video") / "transect.avi"
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (160, 120))
+    for i in range(24):
+        out.write(cv2.cvtColor(reef_image(160, 120, seed=i), cv2.COLOR_RGB2BGR))
+    out.release()
+    return path
+
+
+def sequential(path, stride):
+    cap = cv2.VideoCapture(str(path))
+    rows, frame_no = [], 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if frame_no % stride == 0:
+            rows.append((frame_no, analyze_bgr(frame)))
+        frame_no += 1
+    cap.release()
+    return rows
+
+
+def test_rows_in_order_and_match_sequential(clip):
+    rows = list(analyze_video(clip, stride=2, workers=3, queue_size=2, window=4))
+    expected = sequential(clip, 2)
+    assert [r["frame"] for r in rows] == [f for f, _ in expected]
+    for row, (_, R) in zip(rows, expected):
+        assert {k: row[k] for k in METRICS} == pytest.approx({k: float(R[k]) for k in METRICS})
+    last = rows[-4:]
+    assert rows[-1]["health_roll"] == pytest.approx(sum(r["health"] for r in last) / 4, abs=0.01)
+
+
+def test_closing_early_stops_every_thread(clip, monkeypatch):
+    def slow(frame, th):
+        time.sleep(0.02)    # workers busy while the producer's sentinels are drained
+        return analyze_bgr(frame, th)
+
+    monkeypatch.setattr(video, "analyze_bgr", slow)
+    before = threading.active_count()
+    gen = analyze_video(clip, stride=1, workers=3, queue_size=1)
+    next(gen)
+    gen.close()
+    assert threading.active_count() == before